@@ -1,14 +1,33 @@
 # main.py
 
 # Modules
+import argparse
+import sys
 import tkinter as tk
-from tkinter import CENTER, font, messagebox, ttk
+from tkinter import CENTER, filedialog, font, messagebox, ttk
 from PIL import Image, ImageTk
 import sqlite3
 from sqlite3 import Error
 import os
 import datetime
 import re
+import time
+import threading
+import queue
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import functools
+import base64
+import hashlib
+import hmac
+import json
+import csv
+import logging
+from logging.handlers import RotatingFileHandler
+import math
+import calendar
+import heapq
 
 
 
@@ -22,43 +41,633 @@ COLOR_2 = "#D3E4CD"
 COLOR_3 = "#ADC2A9"
 COLOR_4 = "#99A799"
 
+# Budget categories: budget.category_kind
+BUDGET_EXPENSE = "exp"
+BUDGET_SUBSCRIPTION = "sub"
+BUDGET_INCOME = "inc"
+BUDGET_SAVING = "sav"
+BUDGET_INVEST = "inv"
+TOTALS_EXPENSE = "expense"
+TOTALS_BUDGET = "budget_"
+SUMMARY_PERIODS = {"Daily": "day", "Weekly": "week", "Monthly": "month", "Yearly": "year"}
+SUMMARY_BENCHMARK_ROWS = 1000000
+ROLLUP_GRAINS = ("year", "month", "week", "day")
+SUBSCRIPTION_INTERVALS = {"Weekly": "week", "Monthly": "month", "Yearly": "year"}
+SUBSCRIPTION_WINDOW_MONTHS = 12
+SUBSCRIPTION_VIEW_ROWS = 1000
+CHART_CACHE_SIZE = 8
+CHART_SIZE = (6.4, 2.4)
+CHART_DPI = 100
+# Drill-down from a grain to the next finer one, None is the top (years)
+ROLLUP_DRILL = {None: "year", "year": "month", "month": "day", "week": "day"}
+STATEMENT_CACHE_SIZE = 128
+MIGRATION_CHUNK_SIZE = 5000
+DB_QUEUE_SIZE = 32
+DB_POLL_MS = 20
+SLOW_QUERY_MS = 200
+SLOW_QUERY_LOG = "log/slow_query.log"
+SLOW_QUERY_LOG_BYTES = 1000000
+ERROR_LOG = "log/error.log"
+HISTOGRAM_STEPS = 4
+PASSWORD_ALGORITHM = "pbkdf2_sha256"
+PASSWORD_ITERATIONS = 600000
+PASSWORD_SALT_BYTES = 16
+PASSWORD_TARGET_MS = 250
+BACKGROUND_IMAGE = 'img/background.jpg'
+RESIZE_DELAY_MS = 80
+RESIZE_BUCKET = 32
+RENDITION_CACHE_SIZE = 8
+PAGE_SIZE = 100
+PAGE_WINDOW = 500
+PAGE_MARGIN = 0.1
+# Keyset ahead of the newest (date, id) of any table
+PAGE_START = (2**63 - 1, 2**63 - 1)
+
+# Money is kept as an integer number of minor units (cents)
+MINOR_UNITS = 100
+MINOR_DIGITS = 2
+# Largest amount in minor units that fits an SQLite integer
+MAX_MINOR = 2**63 - 1
+
+# Dates are stored as integer epoch seconds (UTC) and shown in local time
+DATE_FORMAT = "%Y-%m-%d"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+SECONDS_PER_DAY = 86400
+
 # Current path
 current_path = os.path.dirname(os.path.abspath(__file__))
 
+# Errors of database jobs and of callbacks run on the Tk thread
+logger = logging.getLogger(__name__)
+
+# Function to also write logged errors to the rotating error log
+def open_error_log(path=current_path):
+    os.makedirs(os.path.dirname(os.path.join(path, ERROR_LOG)), exist_ok=True)
+    handler = RotatingFileHandler(os.path.join(path, ERROR_LOG),
+        maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=3)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(handler)
+
+# Amount of money in integer minor units, so sums are exact.
+# It is stored as an INTEGER in the database and shown as a decimal only on screen.
+@functools.total_ordering
+class Money:
+    __slots__ = ("minor",)
+
+    def __init__(self, minor=0):
+        self.minor = int(minor)
+
+    # read an amount typed by the user, e.g. "1,250.5"
+    @classmethod
+    def parse(cls, text):
+        try:
+            amount = Decimal(str(text).strip().replace(",", ""))
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {text!r}")
+        if not amount.is_finite():
+            raise ValueError(f"Invalid amount: {text!r}")
+        minor = int((amount * MINOR_UNITS).to_integral_value(ROUND_HALF_UP))
+        if abs(minor) > MAX_MINOR:
+            raise ValueError(f"Invalid amount: {text!r}")
+        return cls(minor)
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor + other.minor)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    # let sum() start from 0
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor - other.minor)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.minor)
+
+    def __eq__(self, other):
+        return isinstance(other, Money) and self.minor == other.minor
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.minor < other.minor
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.minor)
+
+    def __str__(self):
+        sign = "-" if self.minor < 0 else ""
+        units, minor = divmod(abs(self.minor), MINOR_UNITS)
+        return f"{sign}{units}.{minor:0{MINOR_DIGITS}d}"
+
+    def __repr__(self):
+        return f"Money({str(self)!r})"
+
+# Money is bound to queries as its minor units
+sqlite3.register_adapter(Money, lambda money: money.minor)
+
+# Function to get the current time as epoch seconds
+def now_timestamp():
+    return int(time.time())
+
+# Function to convert a datetime (local time when naive) to epoch seconds
+def to_timestamp(moment):
+    return int(moment.timestamp())
+
+# Function to read a yyyy-mm-dd date as the epoch seconds of its local midnight
+def parse_date(text):
+    return to_timestamp(datetime.datetime.strptime(text, DATE_FORMAT))
+
+# Function to show epoch seconds as local date text
+def format_timestamp(timestamp, fmt=DATETIME_FORMAT):
+    if timestamp is None:
+        return ""
+    return datetime.datetime.fromtimestamp(timestamp).strftime(fmt)
+
+# Local day number (days since 1970-01-01) for bucketing by day, week and month
+def day_number(timestamp):
+    return (timestamp + time.localtime(timestamp).tm_gmtoff) // SECONDS_PER_DAY
+
+# Monday-based week number, 1970-01-01 was a Thursday
+def week_number(day):
+    return (day + 3) // 7
+
+# Month number (year * 12 + month - 1) of a day number
+def month_number(day):
+    date = datetime.date(1970, 1, 1) + datetime.timedelta(days=day)
+    return date.year * 12 + date.month - 1
+
+# First and last day number of a period of a grain (day, week, month number or year)
+def period_days(grain, period):
+    if grain == "day":
+        return period, period
+    if grain == "week":
+        return period * 7 - 3, period * 7 + 3
+    first, last = (period * 12, period * 12 + 11) if grain == "year" else (period, period)
+    epoch = datetime.date(1970, 1, 1)
+    start = datetime.date(first // 12, first % 12 + 1, 1)
+    end = datetime.date((last + 1) // 12, (last + 1) % 12 + 1, 1)
+    return (start - epoch).days, (end - epoch).days - 1
+
+# Month key (yyyymm) of epoch seconds in local time, as used by monthly_totals
+def month_key(timestamp):
+    moment = datetime.datetime.fromtimestamp(timestamp)
+    return moment.year * 100 + moment.month
+
+# Epoch seconds of the local start of a month key (yyyymm)
+def month_start(month):
+    return to_timestamp(datetime.datetime(month // 100, month % 100, 1))
+
+# First and last month key of [start, end) when it is made of whole local months, else None
+def whole_months(strt_dt, end_dt):
+    if end_dt <= strt_dt:
+        return None
+    first, last = month_key(strt_dt), month_key(end_dt - 1)
+    following = last + 89 if last % 100 == 12 else last + 1
+    if month_start(first) != strt_dt or month_start(following) != end_dt:
+        return None
+    return first, last
+
+# Function to hash a password, the result records how it was made:
+# pbkdf2_sha256$<iterations>$<salt>$<hash>
+def hash_password(password, iterations=None):
+    iterations = iterations or PASSWORD_ITERATIONS
+    salt = os.urandom(PASSWORD_SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return "$".join([PASSWORD_ALGORITHM, str(iterations),
+        base64.b64encode(salt).decode(), base64.b64encode(digest).decode()])
+
+# Function to split a stored password hash, None for an old plaintext password
+def split_password_hash(stored):
+    parts = stored.split("$")
+    if len(parts) != 4 or parts[0] != PASSWORD_ALGORITHM or not parts[1].isdigit():
+        return None
+    return int(parts[1]), base64.b64decode(parts[2]), base64.b64decode(parts[3])
+
+# Function to check a password against its stored hash (or old plaintext password)
+def verify_password(password, stored):
+    parts = split_password_hash(stored)
+    if parts is None:
+        return hmac.compare_digest(password.encode(), stored.encode())
+    iterations, salt, expected = parts
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return hmac.compare_digest(digest, expected)
+
+# Function to tell if a stored password was made with less than the current cost
+def needs_rehash(stored):
+    parts = split_password_hash(stored)
+    return parts is None or parts[0] < PASSWORD_ITERATIONS
+
+# Function to find the iterations that take about target_ms per hash on this machine
+def calibrate_password_iterations(target_ms=PASSWORD_TARGET_MS):
+    iterations = 10000
+    while True:
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", b"benchmark", b"0" * PASSWORD_SALT_BYTES, iterations)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"{iterations:>10} iterations: {elapsed_ms:.1f} ms")
+        if elapsed_ms >= target_ms / 2:
+            return max(iterations, int(iterations * target_ms / elapsed_ms))
+        iterations *= 2
+
 # Connect database
 def connect_db(path=current_path):
     connection = None
     try:
-        connection = sqlite3.connect(os.path.join(path, 'database/database.sqlite'))
+        # connections are owned by one thread but closed by the manager on shutdown
+        connection = sqlite3.connect(os.path.join(path, 'database/database.sqlite'),
+            check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
         print("Connection to SQLite DB successful")
         return connection
     except Error as e:
         print(f"The error '{e}' occurred")
 
+# Distinct statement texts run through the manager on one connection.
+# sqlite3 keeps compiled statements in its own cache (cached_statements) that cannot
+# be inspected, and statements outside the manager (BEGIN, pragmas, migrations) use it
+# too, so this is not a count of cache hits. While a connection has seen fewer distinct
+# statements than STATEMENT_CACHE_SIZE, the cache is big enough for the app's queries.
+class StatementsSeen:
+    def __init__(self):
+        self.statements = set()
+        self.runs = 0
+
+    def add(self, query):
+        self.statements.add(query)
+        self.runs += 1
+
+# Normalize a statement for the stats: one line, literals replaced by ?
+# The app runs the same few statement texts over and over, so the result is memoized
+@functools.lru_cache(maxsize=1024)
+def normalize_query(query):
+    query = re.sub(r"'(?:[^']|'')*'", "?", query)
+    query = re.sub(r"\b\d+(?:\.\d+)?\b", "?", query)
+    return " ".join(query.split())
+
+# Call count, rows and latency histogram of one statement.
+# The histogram has HISTOGRAM_STEPS buckets per doubling of the latency,
+# starting at one microsecond, so percentiles are within about 20%.
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.buckets = {}
+
+    def add(self, seconds, rows):
+        self.count += 1
+        self.rows += rows
+        self.seconds += seconds
+        bucket = max(0, math.ceil(HISTOGRAM_STEPS * math.log2(max(seconds * 1000000, 1))))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    # upper bound (ms) of the bucket holding the percentile
+    def percentile(self, percent):
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return 2 ** (bucket / HISTOGRAM_STEPS) / 1000
+        return 0.0
+
+    def to_dict(self):
+        return {"count": self.count, "rows": self.rows,
+            "mean_ms": self.seconds * 1000 / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50), "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99)}
+
+# Keep one long-lived connection per thread instead of reconnecting per query
+class ConnectionManager:
+    def __init__(self, path=current_path):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.seen = []
+        self.closed = False
+        self.stats = {}
+        self.slow_query_ms = SLOW_QUERY_MS
+        self.slow_log = None
+
+    # get the calling thread's connection, opening it on first use
+    def get_connection(self):
+        if self.closed:
+            print("The connection manager is already closed")
+            return None
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            with self.lock:
+                connection = connect_db(self.path)
+                if connection is not None:
+                    self.connections.append(connection)
+                    self.local.seen = StatementsSeen()
+                    self.seen.append(self.local.seen)
+            self.local.connection = connection
+        return connection
+
+    # distinct statements seen by all connections, and the most seen by one of them
+    def statements_seen_stats(self):
+        with self.lock:
+            runs = sum(seen.runs for seen in self.seen)
+            distinct = set().union(*(seen.statements for seen in self.seen))
+            most = max((len(seen.statements) for seen in self.seen), default=0)
+        return {"runs": runs, "distinct_statements": len(distinct),
+            "most_on_one_connection": most, "cached_statements": STATEMENT_CACHE_SIZE}
+
+    # add one run of a statement to the stats, log it when it was slow
+    def record(self, connection, query, params, started, rows):
+        seconds = time.perf_counter() - started
+        statement = normalize_query(query)
+        with self.lock:
+            stats = self.stats.get(statement)
+            if stats is None:
+                stats = self.stats[statement] = QueryStats()
+            stats.add(seconds, max(rows, 0))
+        if seconds * 1000 >= self.slow_query_ms:
+            self.log_slow_query(connection, query, params, statement, seconds)
+
+    # write a slow statement and its plan to the rotating slow query log
+    def log_slow_query(self, connection, query, params, statement, seconds):
+        plan = "(no plan for executemany)"
+        if params is not None:
+            try:
+                rows = connection.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+                plan = "; ".join(row[-1] for row in rows)
+            except Error as e:
+                plan = f"(no plan: {e})"
+        with self.lock:
+            if self.slow_log is None:
+                os.makedirs(os.path.dirname(os.path.join(self.path, SLOW_QUERY_LOG)), exist_ok=True)
+                handler = RotatingFileHandler(os.path.join(self.path, SLOW_QUERY_LOG),
+                    maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=3)
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                self.slow_log = logging.getLogger(f"{__name__}.slow_query.{id(self)}")
+                self.slow_log.setLevel(logging.INFO)
+                self.slow_log.propagate = False
+                self.slow_log.addHandler(handler)
+        self.slow_log.info(f"{seconds * 1000:.1f} ms | {statement} | plan: {plan}")
+
+    # statement stats (and distinct statements seen) as JSON, also written to path if given
+    def dump_stats(self, path=None):
+        with self.lock:
+            statements = {statement: stats.to_dict() for statement, stats in self.stats.items()}
+        text = json.dumps({"slow_query_ms": self.slow_query_ms,
+            "statements_seen": self.statements_seen_stats(),
+            "statements": statements}, indent=2)
+        if path:
+            with open(path, "w") as file:
+                file.write(text)
+        return text
+
+    # Function to execute query
+    def execute_query(self, query, params=()):
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        cursor = connection.cursor()
+        try:
+            self.local.seen.add(query)
+            started = time.perf_counter()
+            cursor.execute(query, params)
+            connection.commit()
+            self.record(connection, query, params, started, cursor.rowcount)
+            print("Query executed successfully")
+            return cursor
+        except Error as e:
+            connection.rollback()
+            print(f"The error '{e}' occurred")
+        finally:
+            cursor.close()
+
+    # Function to execute query for many rows in one transaction
+    def execute_many_query(self, query, rows):
+        connection = self.get_connection()
+        if connection is None:
+            return False
+        cursor = connection.cursor()
+        try:
+            self.local.seen.add(query)
+            # commit once at the end, or roll back every row on error
+            started = time.perf_counter()
+            with connection:
+                cursor.executemany(query, rows)
+            self.record(connection, query, None, started, cursor.rowcount)
+            print("Query executed successfully")
+            return True
+        except Error as e:
+            print(f"The error '{e}' occurred")
+            return False
+        finally:
+            cursor.close()
+
+    # Run several statements as one transaction on the calling thread's connection
+    @contextmanager
+    def transaction(self):
+        connection = self.get_connection()
+        connection.execute("BEGIN")
+        try:
+            yield connection
+        except BaseException:
+            connection.rollback()
+            raise
+        else:
+            connection.commit()
+
+    # Function to read query
+    def execute_read_query(self, query, params=()):
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        cursor = connection.cursor()
+        try:
+            self.local.seen.add(query)
+            started = time.perf_counter()
+            cursor.execute(query, params)
+            result = cursor.fetchall()
+            self.record(connection, query, params, started, len(result))
+            return result
+        except Error as e:
+            print(f"The error '{e}' occurred")
+        finally:
+            cursor.close()
+
+    # close every thread's connection (called when the app is destroyed)
+    def close(self):
+        with self.lock:
+            self.closed = True
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+
+db = ConnectionManager()
+
 # Function to execute query
-def execute_query(query):
-    connection = connect_db()
-    cursor = connection.cursor()
-    try:
-        cursor.execute(query)
-        connection.commit()
-        connection.close()
-        print("Query executed successfully")
-    except Error as e:
-        print(f"The error '{e}' occurred")
+def execute_query(query, params=()):
+    return db.execute_query(query, params)
+
+# Function to execute query for many rows in one transaction
+def execute_many_query(query, rows):
+    return db.execute_many_query(query, rows)
 
 # Function to read query
-def execute_read_query(query):
-    connection = connect_db()
-    cursor = connection.cursor()
-    result = None
-    try:
-        cursor.execute(query)
-        result = cursor.fetchall()
-        connection.close()
-        return result
-    except Error as e:
-        print(f"The error '{e}' occurred")
+def execute_read_query(query, params=()):
+    return db.execute_read_query(query, params)
+
+# A job for the database worker, it can be cancelled until it runs.
+# error(exception) is called instead of callback(result) when the job raises.
+class DatabaseRequest:
+    def __init__(self, function, args, callback, key, error=None):
+        self.function = function
+        self.args = args
+        self.callback = callback
+        self.key = key
+        self.error = error
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+# In-process publish/subscribe of data changes.
+# The write layer publishes (table, user_id, category) from any thread,
+# dispatch() calls the subscribers of the table on the Tk thread.
+# Every publish also bumps the data version of the user, shared by all sessions.
+class EventBus:
+    def __init__(self):
+        self.subscribers = {}
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.versions = {}
+
+    def subscribe(self, table, callback):
+        with self.lock:
+            self.subscribers.setdefault(table, []).append(callback)
+
+    def unsubscribe(self, table, callback):
+        with self.lock:
+            callbacks = self.subscribers.get(table, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    # category narrows the change, e.g. the budget kind, None for the whole table.
+    # Returns the new data version of the user.
+    def publish(self, table, user_id, category=None):
+        with self.lock:
+            version = self.versions[user_id] = self.versions.get(user_id, 0) + 1
+        self.events.put((table, user_id, category))
+        return version
+
+    # number of changes published for a user, cached summaries remember it
+    def version(self, user_id):
+        with self.lock:
+            return self.versions.get(user_id, 0)
+
+    # call callback(user_id, category) for every queued change, a failing callback is logged and skipped
+    def dispatch(self):
+        while True:
+            try:
+                table, user_id, category = self.events.get_nowait()
+            except queue.Empty:
+                break
+            with self.lock:
+                callbacks = list(self.subscribers.get(table, []))
+            for callback in callbacks:
+                try:
+                    callback(user_id, category)
+                except Exception:
+                    logger.exception("Subscriber of %s changes failed", table)
+
+bus = EventBus()
+
+# Run database work off the Tk thread.
+# Jobs wait in a bounded queue, results are handed back to the Tk thread by
+# polling with after(), so callbacks may touch widgets.
+# A job submitted with a key supersedes the older job with the same key.
+# Data change events of bus are dispatched by the same polling.
+class DatabaseWorker(threading.Thread):
+    def __init__(self, root, max_queue=DB_QUEUE_SIZE, bus=None):
+        super().__init__(name="database-worker", daemon=True)
+        self.root = root
+        self.bus = bus
+        self.requests = queue.Queue(maxsize=max_queue)
+        self.results = queue.Queue()
+        self.latest = {}
+        self.lock = threading.Lock()
+        self.poll_id = None
+
+    # queue function(*args) and call callback(result) on the Tk thread.
+    # When it raises, error(exception) is called instead, or a warning is shown.
+    def submit(self, function, *args, callback=None, key=None, error=None):
+        request = DatabaseRequest(function, args, callback, key, error)
+        try:
+            self.requests.put_nowait(request)
+        except queue.Full:
+            messagebox.showwarning("Database", "The database is busy, please try again.")
+            return None
+        if key is not None:
+            with self.lock:
+                previous = self.latest.get(key)
+                self.latest[key] = request
+            if previous is not None:
+                previous.cancel()
+        return request
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            if request.cancelled:
+                continue
+            try:
+                result = request.function(*request.args)
+            except Exception as e:
+                logger.exception("Database job %s failed", getattr(request.function, "__qualname__", request.function))
+                self.results.put((request, None, e))
+                continue
+            self.results.put((request, result, None))
+
+    # hand finished jobs to their callbacks (on the Tk thread).
+    # A failing callback is logged and skipped, polling always goes on.
+    def Poll(self):
+        try:
+            while True:
+                try:
+                    request, result, failure = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                if request.key is not None:
+                    with self.lock:
+                        if self.latest.get(request.key) is request:
+                            del self.latest[request.key]
+                if request.cancelled:
+                    continue
+                try:
+                    if failure is None:
+                        if request.callback is not None:
+                            request.callback(result)
+                    elif request.error is not None:
+                        request.error(failure)
+                    else:
+                        messagebox.showwarning("Database", f"Your request could not be done, see {ERROR_LOG}.")
+                except Exception:
+                    logger.exception("Callback of %s failed", request.function)
+            if self.bus is not None:
+                self.bus.dispatch()
+        finally:
+            self.poll_id = self.root.after(DB_POLL_MS, self.Poll)
+
+    def stop(self):
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.requests.put(None)
+        self.join(timeout=5)
 
 # Create table: users
 create_users_tables = """
@@ -68,7 +677,6 @@ CREATE TABLE IF NOT EXISTS users (
     password TEXT NOT NULL
 );
 """
-execute_query(create_users_tables)
 
 # Create table: budget
 create_budget_tables = """
@@ -90,7 +698,6 @@ CREATE TABLE IF NOT EXISTS budget (
     FOREIGN KEY (user_id) REFERENCES users (user_id)
 );
 """
-execute_query(create_budget_tables)
 
 # Create table: expense
 create_expense_tables = """
@@ -104,13 +711,1425 @@ CREATE TABLE IF NOT EXISTS expense (
     FOREIGN KEY (user_id) REFERENCES users (user_id)
 );
 """
-execute_query(create_expense_tables)
+
+# Create index: expense by user and date
+create_expense_index = """
+CREATE INDEX IF NOT EXISTS idx_expense_user_date ON expense (user_id, exp_date);
+"""
+
+# Create table: budget lines, one row per line with its category
+# Built as budget_line_new and renamed to budget by the migration from the sparse table
+create_budget_line_tables = """
+CREATE TABLE IF NOT EXISTS budget_line_new (
+    bg_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    category_kind TEXT NOT NULL,
+    bg_label TEXT NOT NULL,
+    bg_amt REAL NOT NULL,
+    bg_date TEXT,
+    bg_description TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+"""
+
+# Create index: budget lines by user, category and date
+create_budget_line_index = """
+CREATE INDEX IF NOT EXISTS idx_budget_user_kind_date ON budget_line_new (user_id, category_kind, bg_date);
+"""
+
+# Column pairs of the sparse budget table for each category
+sparse_budget_columns = [
+    (BUDGET_EXPENSE, "bg_exp_type", "bg_exp_amt"),
+    (BUDGET_SUBSCRIPTION, "bg_sub_type", "bg_sub_amt"),
+    (BUDGET_INCOME, "bg_inc_type", "bg_inc_amt"),
+    (BUDGET_SAVING, "bg_sav_group", "bg_sav_amt"),
+    (BUDGET_INVEST, "bg_inv_purpose", "bg_inv_amt"),
+]
+sparse_budget_filled = " OR ".join(f"({label} IS NOT NULL AND {amount} IS NOT NULL)"
+    for kind, label, amount in sparse_budget_columns)
+sparse_budget_kind = "CASE " + " ".join(f"WHEN {label} IS NOT NULL AND {amount} IS NOT NULL THEN '{kind}'"
+    for kind, label, amount in sparse_budget_columns) + " END"
+sparse_budget_label = "CASE " + " ".join(f"WHEN {label} IS NOT NULL AND {amount} IS NOT NULL THEN {label}"
+    for kind, label, amount in sparse_budget_columns) + " END"
+sparse_budget_amount = "CASE " + " ".join(f"WHEN {label} IS NOT NULL AND {amount} IS NOT NULL THEN {amount}"
+    for kind, label, amount in sparse_budget_columns) + " END"
+
+# Create table: budget with integer amounts
+create_budget_minor_tables = """
+CREATE TABLE IF NOT EXISTS budget_new (
+    bg_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    category_kind TEXT NOT NULL,
+    bg_label TEXT NOT NULL,
+    bg_amt INTEGER NOT NULL,
+    bg_date TEXT,
+    bg_description TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+"""
+
+# Create table: expense with integer amounts
+create_expense_minor_tables = """
+CREATE TABLE IF NOT EXISTS expense_new (
+    exp_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exp_date TEXT,
+    exp_type TEXT,
+    exp_amt INTEGER,
+    exp_description TEXT,
+    user_id INTEGER NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+"""
+
+# Create table: budget with epoch second dates
+create_budget_epoch_tables = """
+CREATE TABLE IF NOT EXISTS budget_new (
+    bg_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    category_kind TEXT NOT NULL,
+    bg_label TEXT NOT NULL,
+    bg_amt INTEGER NOT NULL,
+    bg_date INTEGER,
+    bg_description TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+"""
+
+# Create table: expense with epoch second dates
+create_expense_epoch_tables = """
+CREATE TABLE IF NOT EXISTS expense_new (
+    exp_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exp_date INTEGER,
+    exp_type TEXT,
+    exp_amt INTEGER,
+    exp_description TEXT,
+    user_id INTEGER NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+"""
+
+# Create index: unique username for login lookups and atomic registration
+create_users_index = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username);
+"""
+
+# Create table: monthly totals per user, month (yyyymm), kind and category.
+# kind is "expense" for expenses and "budget_<category_kind>" for budget lines.
+create_monthly_totals_tables = """
+CREATE TABLE IF NOT EXISTS monthly_totals (
+    user_id INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, kind, category)
+) WITHOUT ROWID;
+"""
+
+# Ledger tables summed into monthly_totals: table, changed columns and the user, month,
+# kind, category and amount of a row, {row} is NEW. or OLD. in triggers.
+# Months are local time like the dates shown in the app, rows without a date go to month 0.
+monthly_totals_sources = [
+    ("expense", "user_id, exp_date, exp_type, exp_amt",
+        "{row}user_id",
+        "IFNULL(CAST(strftime('%Y%m', {row}exp_date, 'unixepoch', 'localtime') AS INTEGER), 0)",
+        f"'{TOTALS_EXPENSE}'",
+        "IFNULL({row}exp_type, '')",
+        "IFNULL({row}exp_amt, 0)"),
+    ("budget", "user_id, category_kind, bg_date, bg_label, bg_amt",
+        "{row}user_id",
+        "IFNULL(CAST(strftime('%Y%m', {row}bg_date, 'unixepoch', 'localtime') AS INTEGER), 0)",
+        f"'{TOTALS_BUDGET}' || {{row}}category_kind",
+        "{row}bg_label",
+        "{row}bg_amt"),
+]
+
+# Triggers keeping monthly_totals current on insert, update and delete of a ledger table
+def monthly_totals_triggers(source):
+    table, columns, user, month, kind, category, amount = source
+    def key(row):
+        return [part.format(row=row) for part in (user, month, kind, category, amount)]
+    new_user, new_month, new_kind, new_category, new_amount = key("NEW.")
+    old_user, old_month, old_kind, old_category, old_amount = key("OLD.")
+    add = f"""INSERT INTO monthly_totals (user_id, month, kind, category, total, count)
+    VALUES ({new_user}, {new_month}, {new_kind}, {new_category}, {new_amount}, 1)
+    ON CONFLICT (user_id, month, kind, category)
+    DO UPDATE SET total = total + excluded.total, count = count + 1;"""
+    match = f"""user_id = {old_user} AND month = {old_month} AND kind = {old_kind} AND category = {old_category}"""
+    remove = f"""UPDATE monthly_totals SET total = total - {old_amount}, count = count - 1
+    WHERE {match};
+    DELETE FROM monthly_totals WHERE {match} AND count <= 0;"""
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_totals_insert AFTER INSERT ON {table}
+BEGIN
+    {add}
+END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_totals_update AFTER UPDATE OF {columns} ON {table}
+BEGIN
+    {remove}
+    {add}
+END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_totals_delete AFTER DELETE ON {table}
+BEGIN
+    {remove}
+END""",
+    ]
+
+# Sum a whole ledger table into the (empty) monthly_totals
+def monthly_totals_backfill(source):
+    table, columns, user, month, kind, category, amount = source
+    user, month, kind, category, amount = [part.format(row="") for part in (user, month, kind, category, amount)]
+    return f"""INSERT INTO monthly_totals (user_id, month, kind, category, total, count)
+SELECT {user}, {month}, {kind}, {category}, SUM({amount}), COUNT(*) FROM {table}
+GROUP BY 1, 2, 3, 4"""
+
+# Create table: subscription rules, one row per subscription however many charges it makes.
+# sub_anchor is the first charge and sub_end the end (exclusive) in epoch seconds,
+# sub_end is NULL while the subscription runs, sub_interval is week, month or year.
+create_subscription_tables = """
+CREATE TABLE IF NOT EXISTS subscription (
+    sub_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    sub_type TEXT NOT NULL,
+    sub_amt INTEGER NOT NULL,
+    sub_interval TEXT NOT NULL,
+    sub_anchor INTEGER NOT NULL,
+    sub_end INTEGER,
+    sub_description TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+"""
+
+# Create index: subscription rules of a user
+create_subscription_index = """
+CREATE INDEX IF NOT EXISTS idx_subscription_user ON subscription (user_id);
+"""
+
+# Migration step: update rows of a big table in chunks, one transaction per chunk,
+# e.g. to fill a column added by ALTER TABLE ... ADD COLUMN.
+# where must exclude the rows already done so an interrupted backfill can resume.
+class Backfill:
+    def __init__(self, table, assignments, where, chunk_size=MIGRATION_CHUNK_SIZE):
+        self.query = f"""UPDATE {table} SET {assignments}
+        WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)
+        """
+        self.chunk_size = chunk_size
+
+    def run(self, manager):
+        while True:
+            with manager.transaction() as connection:
+                count = connection.execute(self.query, (self.chunk_size,)).rowcount
+            if count < self.chunk_size:
+                break
+
+# Migration step: copy rows into a rebuilt table in rowid chunks, one transaction per chunk.
+# The target keeps the source rowid as its primary key, so the copy resumes after the
+# last copied row. Indexes created on the target first are built up chunk by chunk,
+# which is how a large index is added without locking the table for the whole build.
+class CopyRows:
+    def __init__(self, source, target, columns, select, where="1", chunk_size=MIGRATION_CHUNK_SIZE):
+        self.source = source
+        self.target = target
+        self.query = f"""INSERT OR IGNORE INTO {target} ({columns})
+        SELECT {select} FROM {source}
+        WHERE rowid > ? AND rowid <= ? AND ({where})
+        """
+        self.chunk_size = chunk_size
+
+    def run(self, manager):
+        connection = manager.get_connection()
+        last = connection.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {self.target}").fetchone()[0]
+        select_last = f"SELECT MAX(rowid) FROM (SELECT rowid FROM {self.source} WHERE rowid > ? ORDER BY rowid LIMIT ?)"
+        while True:
+            upto = connection.execute(select_last, (last, self.chunk_size)).fetchone()[0]
+            if upto is None:
+                break
+            with manager.transaction() as connection:
+                connection.execute(self.query, (last, upto))
+            last = upto
+
+# One schema version: SQL strings and chunked steps, run in order.
+# SQL steps between chunked steps share a transaction with the version bump or the next
+# chunked step, so a migration without chunked steps is applied atomically.
+# Every step must be safe to run again in case a migration was interrupted.
+class Migration:
+    def __init__(self, version, description, steps):
+        self.version = version
+        self.description = description
+        self.steps = steps
+
+    def run(self, manager):
+        statements = []
+        for step in self.steps:
+            if isinstance(step, str):
+                statements.append(step)
+                continue
+            self.execute(manager, statements)
+            statements = []
+            step.run(manager)
+        statements.append(f"PRAGMA user_version = {int(self.version)}")
+        self.execute(manager, statements)
+
+    def execute(self, manager, statements):
+        if statements:
+            with manager.transaction() as connection:
+                for statement in statements:
+                    connection.execute(statement)
+
+# Steps to build the new definition of a table.
+# create makes <table>_new, its indexes are moved over before the rows are copied
+# in chunks. swap_table() then puts the new table in place of the old one.
+def rebuild_table(table, create, indexes, columns, select, where="1"):
+    new_table = f"{table}_new"
+    steps = [create]
+    for name, index_columns in indexes:
+        steps.append(f"DROP INDEX IF EXISTS {name}")
+        steps.append(f"CREATE INDEX IF NOT EXISTS {name} ON {new_table} ({index_columns})")
+    steps.append(CopyRows(table, new_table, columns, select, where))
+    return steps
+
+# Steps to replace a table by its rebuilt <table>_new.
+# They must come after every chunked step of the migration so they commit together
+# with the version bump: until then the old tables are untouched and an interrupted
+# copy resumes from them instead of converting converted rows again.
+def swap_table(table):
+    return [f"DROP TABLE {table}", f"ALTER TABLE {table}_new RENAME TO {table}"]
+
+# Schema migrations, in version order
+MIGRATIONS = [
+    Migration(1, "create users, budget and expense tables",
+        [create_users_tables, create_budget_tables, create_expense_tables]),
+    Migration(2, "index expense by user and date",
+        [create_expense_index]),
+    Migration(3, "store budget as one typed line per row",
+        [create_budget_line_tables, create_budget_line_index,
+        CopyRows("budget", "budget_line_new",
+            "bg_id, user_id, category_kind, bg_label, bg_amt, bg_date, bg_description",
+            f"bg_id, user_id, {sparse_budget_kind}, {sparse_budget_label}, {sparse_budget_amount}, bg_date, bg_description",
+            sparse_budget_filled),
+        "DROP TABLE budget",
+        "ALTER TABLE budget_line_new RENAME TO budget"]),
+    Migration(4, "store amounts as integer minor units",
+        rebuild_table("budget", create_budget_minor_tables,
+            [("idx_budget_user_kind_date", "user_id, category_kind, bg_date")],
+            "bg_id, user_id, category_kind, bg_label, bg_amt, bg_date, bg_description",
+            f"bg_id, user_id, category_kind, bg_label, CAST(ROUND(bg_amt * {MINOR_UNITS}) AS INTEGER), bg_date, bg_description")
+        + rebuild_table("expense", create_expense_minor_tables,
+            [("idx_expense_user_date", "user_id, exp_date")],
+            "exp_id, exp_date, exp_type, exp_amt, exp_description, user_id",
+            f"exp_id, exp_date, exp_type, CAST(ROUND(exp_amt * {MINOR_UNITS}) AS INTEGER), exp_description, user_id")
+        + swap_table("budget") + swap_table("expense")),
+    # old dates are local time text, 'utc' converts them before taking epoch seconds
+    Migration(5, "store dates as epoch seconds",
+        rebuild_table("budget", create_budget_epoch_tables,
+            [("idx_budget_user_kind_date", "user_id, category_kind, bg_date")],
+            "bg_id, user_id, category_kind, bg_label, bg_amt, bg_date, bg_description",
+            "bg_id, user_id, category_kind, bg_label, bg_amt, CAST(strftime('%s', bg_date, 'utc') AS INTEGER), bg_description")
+        + rebuild_table("expense", create_expense_epoch_tables,
+            [("idx_expense_user_date", "user_id, exp_date")],
+            "exp_id, exp_date, exp_type, exp_amt, exp_description, user_id",
+            "exp_id, CAST(strftime('%s', exp_date, 'utc') AS INTEGER), exp_type, exp_amt, exp_description, user_id")
+        + swap_table("budget") + swap_table("expense")),
+    Migration(6, "unique index on username",
+        [create_users_index]),
+    Migration(7, "monthly totals kept by triggers",
+        [create_monthly_totals_tables]
+        + [trigger for source in monthly_totals_sources for trigger in monthly_totals_triggers(source)]
+        + ["DELETE FROM monthly_totals"]
+        + [monthly_totals_backfill(source) for source in monthly_totals_sources]),
+    Migration(8, "subscription rules",
+        [create_subscription_tables, create_subscription_index]),
+]
+
+# Recompute monthly_totals from the ledger tables, e.g. after the database was edited by hand
+def rebuild_monthly_totals(manager=db):
+    with manager.transaction() as connection:
+        connection.execute("DELETE FROM monthly_totals")
+        for source in monthly_totals_sources:
+            connection.execute(monthly_totals_backfill(source))
+
+# Insert a budget line
+insert_budget_line = """
+INSERT INTO budget (user_id, category_kind, bg_date, bg_label, bg_amt, bg_description)
+VALUES (?, ?, ?, ?, ?, ?);
+"""
+
+# Select a page of budget lines of a user in one category, keyset paginated on (bg_date, bg_id).
+# Older pages come newest first and newer pages oldest first, idx_budget_user_kind_date serves both.
+select_budget_older = """SELECT bg_date, bg_id, bg_label, bg_amt, bg_description FROM budget
+WHERE user_id = ? AND category_kind = ? AND (bg_date, bg_id) < (?, ?)
+ORDER BY bg_date DESC, bg_id DESC LIMIT ?
+"""
+select_budget_newer = """SELECT bg_date, bg_id, bg_label, bg_amt, bg_description FROM budget
+WHERE user_id = ? AND category_kind = ? AND (bg_date, bg_id) > (?, ?)
+ORDER BY bg_date ASC, bg_id ASC LIMIT ?
+"""
+
+# Select the monthly totals of a user in [first, last] months (yyyymm)
+select_monthly_totals = """SELECT month, kind, category, total, count FROM monthly_totals
+WHERE user_id = ? AND month >= ? AND month <= ?
+ORDER BY month, kind, category
+"""
+
+# Bring the database schema up to date, nothing runs when it is already current
+def migrate(manager=db, migrations=MIGRATIONS):
+    connection = manager.get_connection()
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version >= migrations[-1].version:
+        return version
+
+    # let readers carry on while long migrations write
+    connection.execute("PRAGMA journal_mode = WAL")
+    for migration in migrations:
+        if migration.version > version:
+            print(f"Migrating database to version {migration.version}: {migration.description}")
+            migration.run(manager)
+            version = migration.version
+    return version
+
+# Insert an expense
+insert_expense = """
+INSERT INTO expense (user_id, exp_date, exp_type, exp_amt, exp_description)
+VALUES (?, ?, ?, ?, ?);
+"""
+
+# Insert, update and delete a subscription rule of a user
+insert_subscription = """
+INSERT INTO subscription (user_id, sub_type, sub_amt, sub_interval, sub_anchor, sub_end, sub_description)
+VALUES (?, ?, ?, ?, ?, ?, ?);
+"""
+update_subscription = """
+UPDATE subscription SET sub_type = ?, sub_amt = ?, sub_interval = ?, sub_anchor = ?, sub_end = ?, sub_description = ?
+WHERE sub_id = ? AND user_id = ?;
+"""
+delete_subscription = """
+DELETE FROM subscription WHERE sub_id = ? AND user_id = ?;
+"""
+
+# Select the subscription rules of a user
+select_subscriptions = """SELECT sub_id, sub_type, sub_amt, sub_interval, sub_anchor, sub_end, sub_description
+FROM subscription WHERE user_id = ? ORDER BY sub_id
+"""
+
+# Select a page of expense of a user in [start, end), keyset paginated on (exp_date, exp_id)
+# exp_date is compared as it is stored so idx_expense_user_date serves the range and the order
+select_expense_older = """SELECT exp_date, exp_id, exp_type, exp_amt, exp_description FROM expense
+WHERE user_id = ? AND exp_date >= ? AND exp_date < ? AND (exp_date, exp_id) < (?, ?)
+ORDER BY exp_date DESC, exp_id DESC LIMIT ?
+"""
+select_expense_newer = """SELECT exp_date, exp_id, exp_type, exp_amt, exp_description FROM expense
+WHERE user_id = ? AND exp_date >= ? AND exp_date < ? AND (exp_date, exp_id) > (?, ?)
+ORDER BY exp_date ASC, exp_id ASC LIMIT ?
+"""
+
+# Function to get a page of expense in [start, end) next to key, for PagedTreeview
+def expense_page(user_id, strt_dt, end_dt, key, older, limit):
+    query = select_expense_older if older else select_expense_newer
+    return execute_read_query(query, (user_id, strt_dt, end_dt) + tuple(key) + (limit,))
+
+# Turn an inclusive yyyy-mm-dd period into a half-open range of epoch seconds
+def date_range_bounds(strt_dt, end_dt):
+    end = datetime.datetime.strptime(end_dt, DATE_FORMAT) + datetime.timedelta(days=1)
+    return parse_date(strt_dt), to_timestamp(end)
+
+# Function to show how SQLite runs a query
+def explain_query(query, params=()):
+    return execute_read_query("EXPLAIN QUERY PLAN " + query, params)
+
+# Check the expense range query is answered from idx_expense_user_date
+def check_expense_index():
+    plan = explain_query(select_expense_older, (0, 0, 0, 0, 0, 0))
+    for row in plan:
+        print(row[-1])
+    return any("idx_expense_user_date" in row[-1] for row in plan)
+
+# Select category, amount and date of the expense of a user in [start, end)
+select_expense_amounts = """SELECT IFNULL(exp_type, ''), IFNULL(exp_amt, 0), exp_date FROM expense
+WHERE user_id = ? AND exp_date >= ? AND exp_date < ?
+"""
+
+# Select label, amount and date of the budget lines of a user in one category in [start, end)
+select_budget_amounts = """SELECT bg_label, bg_amt, bg_date FROM budget
+WHERE user_id = ? AND category_kind = ? AND bg_date >= ? AND bg_date < ?
+"""
+
+
+
+# NumPy is optional, it is only imported when a summary is computed
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+# Local day numbers of epoch seconds as an array, like day_number().
+# The UTC offset is looked up once per UTC day, and per row only on the
+# days where it changes (daylight saving time).
+def day_numbers(np, timestamps):
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if not len(timestamps):
+        return timestamps
+    utc_days = timestamps // SECONDS_PER_DAY
+    first = int(utc_days.min())
+    utc_days -= first
+    starts = np.array([time.localtime((first + day) * SECONDS_PER_DAY).tm_gmtoff
+        for day in range(int(utc_days.max()) + 2)], dtype=np.int64)
+    offsets = starts[utc_days]
+    for day in np.nonzero(starts[:-1] != starts[1:])[0]:
+        rows = np.nonzero(utc_days == day)[0]
+        offsets[rows] = [time.localtime(int(timestamp)).tm_gmtoff for timestamp in timestamps[rows]]
+    return (timestamps + offsets) // SECONDS_PER_DAY
+
+# Period numbers of day numbers: the day, week_number(), month_number() or the year
+def period_numbers(np, days, period):
+    if period == "day" or not len(days):
+        return days
+    if period == "week":
+        return (days + 3) // 7
+    # convert each distinct day once and look the rows up
+    first = int(days.min())
+    months = np.arange(first, int(days.max()) + 1).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    months = months[days - first]
+    if period == "month":
+        return months + 1970 * 12
+    return months // 12 + 1970
+
+# Text of a period number
+def period_label(number, period):
+    if period == "day":
+        return (datetime.date(1970, 1, 1) + datetime.timedelta(days=number)).strftime(DATE_FORMAT)
+    if period == "week":
+        monday = datetime.date(1970, 1, 1) + datetime.timedelta(days=number * 7 - 3)
+        return "Week of " + monday.strftime(DATE_FORMAT)
+    if period == "month":
+        return f"{number // 12}-{number % 12 + 1:02d}"
+    return str(number)
+
+# Ledger of a user as arrays: category codes, amounts in minor units and local day numbers
+class Ledger:
+    def __init__(self, codes, amounts, days):
+        self.codes = codes
+        self.amounts = amounts
+        self.days = days
+
+    # rows are (category, amount, date), categories maps names to codes and grows with new names
+    @classmethod
+    def from_rows(cls, np, rows, categories):
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty, empty, empty)
+        names, amounts, dates = zip(*rows)
+        codes = np.fromiter((categories.setdefault(name, len(categories)) for name in names),
+            dtype=np.int64, count=len(names))
+        return cls(codes, np.array(amounts, dtype=np.int64), day_numbers(np, dates))
+
+# Budget against actual per period and category, computed with vectorized group-bys.
+# budget, actual, variance (budget - actual) and overspend are (periods x categories)
+# arrays of minor units, percent_used is NaN where there is no budget.
+class BudgetReport:
+    def __init__(self, np, budget, actual, categories, period):
+        self.period = period
+        self.categories = categories
+        periods = period_numbers(np, np.concatenate((budget.days, actual.days)), period)
+        # sum over every period from the first to the last, then keep the ones with rows
+        first = int(periods.min()) if len(periods) else 0
+        index = periods - first
+        shape = (int(index.max()) + 1 if len(index) else 0, len(categories))
+        present = np.bincount(index, minlength=shape[0]) > 0
+        self.periods = np.arange(first, first + shape[0])[present]
+        self.budget = self.group_sum(np, index[:len(budget.days)], budget, shape)[present]
+        self.actual = self.group_sum(np, index[len(budget.days):], actual, shape)[present]
+        shape = self.budget.shape
+        self.variance = self.budget - self.actual
+        self.overspend = np.maximum(-self.variance, 0)
+        self.percent_used = np.divide(self.actual * 100.0, self.budget,
+            out=np.full(shape, np.nan), where=self.budget != 0)
+        self.np = np
+
+    # sum of amounts per (period, category) cell
+    @staticmethod
+    def group_sum(np, period_index, ledger, shape):
+        keys = period_index * shape[1] + ledger.codes
+        sums = np.bincount(keys, weights=ledger.amounts, minlength=shape[0] * shape[1])
+        return np.rint(sums).astype(np.int64).reshape(shape)
+
+    # (period, category, budget, actual, variance, percent used, overspend) of the cells with data
+    def rows(self):
+        used = (self.budget != 0) | (self.actual != 0)
+        for p, c in zip(*self.np.nonzero(used)):
+            percent = self.percent_used[p, c]
+            yield (period_label(int(self.periods[p]), self.period), self.categories[c],
+                Money(int(self.budget[p, c])), Money(int(self.actual[p, c])),
+                Money(int(self.variance[p, c])),
+                "" if self.np.isnan(percent) else f"{percent:.0f}%",
+                Money(int(self.overspend[p, c])))
+
+# matplotlib is optional, it is imported for the first chart and only its Agg canvas is used
+def load_matplotlib():
+    try:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+    except ImportError:
+        return None
+    return Figure, FigureCanvasAgg
+
+# Bar chart of budget against actual per period, rendered off-screen with Agg.
+# The bars are drawn over a saved background, when only bar heights change
+# within the current axes just the changed bars are restored and drawn again.
+class BudgetChart:
+    def __init__(self, matplotlib):
+        Figure, FigureCanvasAgg = matplotlib
+        self.figure = Figure(figsize=CHART_SIZE, dpi=CHART_DPI)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        self.labels = None
+        self.limits = None
+        self.bars = []
+        self.background = None
+
+    # values of a BudgetReport: period labels and the budget and actual of each period (major units)
+    @staticmethod
+    def values(report):
+        labels = [period_label(int(period), report.period) for period in report.periods]
+        budget = [int(total) / MINOR_UNITS for total in report.budget.sum(axis=1)]
+        actual = [int(total) / MINOR_UNITS for total in report.actual.sum(axis=1)]
+        return labels, budget + actual
+
+    @staticmethod
+    def y_limits(heights):
+        return min(heights + [0]), max(heights + [0]) * 1.1 or 1
+
+    def update(self, report):
+        labels, heights = self.values(report)
+        if labels != self.labels or self.y_limits(heights) != self.limits:
+            self.draw(labels, heights)
+            return
+        changed = [(bar, value) for bar, value in zip(self.bars, heights) if bar.get_height() != value]
+        if not changed:
+            return
+        # restore the background under the old and the new changed bars, grown to cover
+        # every bar it touches (antialiased edges included), then draw those bars in the
+        # order of a full draw so the pixels match it
+        box = None
+        for bar, value in changed:
+            box = self.union(box, self.pixel_box(bar))
+            bar.set_height(value)
+            box = self.union(box, self.pixel_box(bar))
+        while True:
+            touched = [bar for bar in self.bars if self.intersects(box, self.pixel_box(bar))]
+            grown = box
+            for bar in touched:
+                grown = self.union(grown, self.pixel_box(bar))
+            if grown == box:
+                break
+            box = grown
+        left, top, right, bottom = self.background.get_extents()
+        box = (max(box[0], left), max(box[1], top), min(box[2], right), min(box[3], bottom))
+        self.canvas.restore_region(self.background, bbox=box, xy=(left, top))
+        for bar in touched:
+            self.axes.draw_artist(bar)
+
+    # pixels a bar may touch as (left, top, right, bottom) from the top left, the
+    # background is in pixels from the top left and bars in pixels from the bottom left
+    def pixel_box(self, bar):
+        height = self.canvas.get_width_height()[1]
+        x1, y1, x2, y2 = bar.get_window_extent().extents
+        return (int(x1) - 1, int(height - y2) - 1, int(x2) + 2, int(height - y1) + 2)
+
+    @staticmethod
+    def union(box, other):
+        if box is None:
+            return other
+        return (min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3]))
+
+    @staticmethod
+    def intersects(box, other):
+        return box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]
+
+    # draw the whole figure
+    def draw(self, labels, heights):
+        self.labels = labels
+        self.limits = self.y_limits(heights)
+        axes = self.axes
+        axes.clear()
+        positions = range(len(labels))
+        budget = axes.bar([x - 0.2 for x in positions], heights[:len(labels)], width=0.4,
+            color=COLOR_3, label="Budget", animated=True)
+        actual = axes.bar([x + 0.2 for x in positions], heights[len(labels):], width=0.4,
+            color=COLOR_4, label="Actual", animated=True)
+        self.bars = list(budget) + list(actual)
+        axes.set_xticks(list(positions))
+        axes.set_xticklabels(labels, fontsize=8)
+        axes.tick_params(axis="y", labelsize=8)
+        axes.set_ylim(*self.limits)
+        # the legend sits above the axes so bars never cover it
+        axes.legend(fontsize=8, loc="lower right", bbox_to_anchor=(1, 1), ncol=2, frameon=False)
+        self.figure.set_facecolor(COLOR_1)
+        self.figure.tight_layout()
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(axes.bbox)
+        for bar in self.bars:
+            axes.draw_artist(bar)
+
+    # the rendered chart as a PIL image
+    def image(self):
+        width, height = self.canvas.get_width_height()
+        return Image.frombuffer("RGBA", (width, height), bytes(self.canvas.buffer_rgba()), "raw", "RGBA", 0, 1)
+
+# Budget summaries with their charts, least recently used first, keyed by
+# (user, period, start, end) and remembering the data version they were made from.
+# A summary of an older data version is computed again and its chart updated in place.
+class ChartCache:
+    def __init__(self, size=CHART_CACHE_SIZE):
+        self.entries = OrderedDict()
+        self.size = size
+        self.lock = threading.Lock()
+
+    # (report, chart image) of a session, the image is None without matplotlib
+    def budget_summary(self, session, strt_dt, end_dt, period):
+        key = (session.user_id, period, strt_dt, end_dt)
+        version = session.data_version
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                if entry["version"] == version:
+                    return entry["report"], entry["image"]
+
+        report = session.budget_report(strt_dt, end_dt, period)
+        image = None
+        if report is not None:
+            chart = entry["chart"] if entry is not None else None
+            if chart is None:
+                matplotlib = load_matplotlib()
+                chart = BudgetChart(matplotlib) if matplotlib is not None else None
+            if chart is not None:
+                chart.update(report)
+                image = chart.image()
+        else:
+            chart = None
+
+        with self.lock:
+            self.entries[key] = {"version": version, "report": report, "chart": chart, "image": image}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return report, image
+
+charts = ChartCache()
+
+# Select category, amount and date of every expense of a user
+select_expense_ledger = """SELECT IFNULL(exp_type, ''), IFNULL(exp_amt, 0), exp_date FROM expense
+WHERE user_id = ?
+"""
+
+# Select kind, label, amount and date of every budget line of a user
+select_budget_ledger = """SELECT category_kind, bg_label, bg_amt, bg_date FROM budget
+WHERE user_id = ?
+"""
+
+# Totals and counts per kind, category and period of every grain (day, week, month, year)
+# of one user, built once from the ledger and updated as rows are added.
+# Kinds are named like in monthly_totals. Periods are day_number(), week_number(),
+# month_number() and the year.
+class RollupCube:
+    def __init__(self):
+        self.cells = {}
+        self.children = {}
+        self.lock = threading.Lock()
+
+    # periods of every grain containing a date (epoch seconds)
+    @staticmethod
+    def periods(date):
+        day = day_number(date)
+        month = month_number(day)
+        return {"year": month // 12, "month": month, "week": week_number(day), "day": day}
+
+    # add a row, amount is Money or minor units, rows without a date are not in any period
+    def add(self, kind, category, amount, date):
+        if date is None:
+            return
+        amount = amount.minor if isinstance(amount, Money) else int(amount)
+        periods = self.periods(date)
+        periods[None] = None
+        with self.lock:
+            for grain in ROLLUP_GRAINS:
+                totals = self.cells.setdefault((kind, grain, periods[grain]), {})
+                cell = totals.setdefault(category, [0, 0])
+                cell[0] += amount
+                cell[1] += 1
+            for grain, finer in ROLLUP_DRILL.items():
+                self.children.setdefault((kind, grain, periods[grain]), set()).add(periods[finer])
+
+    # {category: [total, count]} of one period, summed over kinds
+    def categories(self, kinds, grain, period):
+        result = {}
+        with self.lock:
+            for kind in kinds:
+                for category, (total, count) in self.cells.get((kind, grain, period), {}).items():
+                    cell = result.setdefault(category, [0, 0])
+                    cell[0] += total
+                    cell[1] += count
+        return result
+
+    # (grain, period, total, count) of the periods one grain below period, the years when grain is None
+    def drill(self, kinds, grain=None, period=None):
+        finer = ROLLUP_DRILL[grain]
+        with self.lock:
+            periods = set()
+            for kind in kinds:
+                periods.update(self.children.get((kind, grain, period), ()))
+        rows = []
+        for child in sorted(periods):
+            cells = self.categories(kinds, finer, child).values()
+            rows.append((finer, child, sum(cell[0] for cell in cells), sum(cell[1] for cell in cells)))
+        return rows
+
+    # (grain, period, category, total, count) of every period overlapping the days first to last.
+    # Periods cut by the range are clipped to it: their totals are summed from the day
+    # cells inside the range, so every grain adds up to the same total.
+    def rows(self, kinds, first_day, last_day):
+        bounds = {
+            "year": (month_number(first_day) // 12, month_number(last_day) // 12),
+            "month": (month_number(first_day), month_number(last_day)),
+            "week": (week_number(first_day), week_number(last_day)),
+            "day": (first_day, last_day),
+        }
+        with self.lock:
+            keys = [(grain, period) for kind, grain, period in self.cells
+                if kind in kinds and bounds[grain][0] <= period <= bounds[grain][1]]
+        rows = []
+        for grain, period in sorted(set(keys), key=lambda key: (ROLLUP_GRAINS.index(key[0]), key[1])):
+            start, end = period_days(grain, period)
+            if first_day <= start and end <= last_day:
+                categories = self.categories(kinds, grain, period)
+            else:
+                categories = self.clipped(kinds, max(start, first_day), min(end, last_day))
+            for category, (total, count) in sorted(categories.items()):
+                if count:
+                    rows.append((grain, period, category, total, count))
+        return rows
+
+    # {category: [total, count]} of the days first to last, summed from the day cells
+    def clipped(self, kinds, first_day, last_day):
+        result = {}
+        for day in range(first_day, last_day + 1):
+            for category, (total, count) in self.categories(kinds, "day", day).items():
+                cell = result.setdefault(category, [0, 0])
+                cell[0] += total
+                cell[1] += count
+        return result
+
+
+
+# Select the expense total of a user per local day number
+select_daily_spend = """SELECT CAST(strftime('%s', exp_date, 'unixepoch', 'localtime') AS INTEGER) / 86400 AS day,
+SUM(IFNULL(exp_amt, 0)) FROM expense
+WHERE user_id = ? AND exp_date IS NOT NULL
+GROUP BY day
+"""
+
+# Totals per day number in a binary indexed (Fenwick) tree,
+# adding to a day and summing a range of days are O(log n).
+# The tree covers first_day and the size days after it and grows when needed.
+class FenwickTree:
+    def __init__(self, first_day=0, size=1):
+        self.first_day = first_day
+        self.tree = [0] * (size + 1)
+
+    # tree of {day: total}, built in O(n)
+    @classmethod
+    def from_totals(cls, totals):
+        if not totals:
+            return cls()
+        first_day = min(totals)
+        fenwick = cls(first_day, max(totals) - first_day + 1)
+        fenwick.fill(totals)
+        return fenwick
+
+    def fill(self, totals):
+        tree = self.tree
+        for day, total in totals.items():
+            tree[day - self.first_day + 1] += total
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+
+    # add amount to a day
+    def add(self, day, amount):
+        if not self.first_day <= day < self.first_day + len(self.tree) - 1:
+            self.grow(day)
+        i = day - self.first_day + 1
+        while i < len(self.tree):
+            self.tree[i] += amount
+            i += i & -i
+
+    # total of the days before day
+    def prefix(self, day):
+        i = min(max(day - self.first_day, 0), len(self.tree) - 1)
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    # total of the days first to last
+    def range_sum(self, first_day, last_day):
+        if last_day < first_day:
+            return 0
+        return self.prefix(last_day + 1) - self.prefix(first_day)
+
+    # cover day as well, at least doubling the size so growing stays rare
+    def grow(self, day):
+        size = len(self.tree) - 1
+        last_day = self.first_day + size - 1
+        totals = {}
+        for d in range(self.first_day, last_day + 1):
+            total = self.range_sum(d, d)
+            if total:
+                totals[d] = total
+        if day < self.first_day:
+            self.first_day = min(day, self.first_day - size)
+        else:
+            last_day = max(day, last_day + size)
+        self.tree = [0] * (last_day - self.first_day + 2)
+        self.fill(totals)
+
+
+
+# Longest step of each subscription interval in days
+SUBSCRIPTION_STEP_DAYS = {"week": 7, "month": 31, "year": 366}
+
+# Local datetime of the nth charge after anchor, the day is clamped to short months
+# so a subscription anchored on Jan 31 charges Feb 28, Mar 31, ...
+def subscription_charge_time(anchor, interval, n):
+    if interval == "week":
+        return anchor + datetime.timedelta(weeks=n)
+    months = anchor.month - 1 + n * (12 if interval == "year" else 1)
+    year, month = anchor.year + months // 12, months % 12 + 1
+    return anchor.replace(year=year, month=month,
+        day=min(anchor.day, calendar.monthrange(year, month)[1]))
+
+# Charges of one subscription rule in [start, end) in date order, generated lazily
+# as (date, sub_id, type, amount, description).
+# Charge n is at most n longest steps after the anchor, so counting starts there
+# instead of walking every charge since the anchor.
+def subscription_charges(rule, strt_dt, end_dt):
+    sub_id, sub_type, amount, interval, anchor, sub_end, description = rule
+    if sub_end is not None:
+        end_dt = min(end_dt, sub_end)
+    anchor_time = datetime.datetime.fromtimestamp(anchor)
+    n = max(strt_dt - anchor, 0) // (SUBSCRIPTION_STEP_DAYS[interval] * SECONDS_PER_DAY)
+    while True:
+        date = to_timestamp(subscription_charge_time(anchor_time, interval, n))
+        if date >= end_dt:
+            return
+        if date >= strt_dt:
+            yield (date, sub_id, sub_type, amount, description)
+        n += 1
+
+# Charges of many rules in [start, end) merged in date order on a heap,
+# only one pending charge per rule is held at a time
+def merge_subscription_charges(rules, strt_dt, end_dt):
+    return heapq.merge(*(subscription_charges(rule, strt_dt, end_dt) for rule in rules))
+
+# The default subscription window: today and the following months
+def subscription_window(months=SUBSCRIPTION_WINDOW_MONTHS):
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    return to_timestamp(today), to_timestamp(subscription_charge_time(today, "month", months))
+
+# Row of a subscription charge for the subscription table
+def subscription_row(row):
+    return (format_timestamp(row[0], DATE_FORMAT), row[1], row[2], Money(row[3]), row[4])
+
+
+
+# Time a monthly budget report over random rows, None when NumPy is missing
+def benchmark_budget_report(rows=SUMMARY_BENCHMARK_ROWS, categories=50):
+    np = load_numpy()
+    if np is None:
+        return None
+    random = np.random.default_rng(0)
+    end = now_timestamp()
+    start = end - 5 * 365 * SECONDS_PER_DAY
+    def ledger_arrays(size):
+        return (random.integers(0, categories, size), random.integers(1, 100000, size),
+            random.integers(start, end, size))
+    budget = ledger_arrays(rows // 10)
+    actual = ledger_arrays(rows)
+
+    started = time.perf_counter()
+    BudgetReport(np,
+        Ledger(budget[0], budget[1], day_numbers(np, budget[2])),
+        Ledger(actual[0], actual[1], day_numbers(np, actual[2])),
+        [f"category {i}" for i in range(categories)], "month")
+    return time.perf_counter() - started
+
+
+
+# A logged in user with per-user data cached for the pages.
+# Several sessions can live in one process (the GUI, an importer, ...).
+# Every cached value remembers the data version of the user it was loaded at,
+# a write of any session publishes a new version and the value is loaded again
+# on next use, unless this session's own write updated it in place.
+class Session:
+    def __init__(self, user_id, username):
+        self.user_id = user_id
+        self.username = username
+        self.cache = {}
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    # counts the writes of every session of the user, cached summaries remember it
+    @property
+    def data_version(self):
+        return bus.version(self.user_id)
+
+    # cached value, loaded by loader() on first use and after writes of other sessions
+    def get(self, key, loader):
+        # a write during the load leaves the value at the older version, to be loaded again
+        version = self.data_version
+        with self.lock:
+            if key in self.cache and self.versions[key] == version:
+                return self.cache[key]
+        value = loader()
+        with self.lock:
+            self.cache[key] = value
+            self.versions[key] = version
+        return value
+
+    # current cached value, None when it is not loaded or stale
+    def peek(self, key):
+        version = self.data_version
+        with self.lock:
+            if self.versions.get(key) == version:
+                return self.cache.get(key)
+        return None
+
+    # drop cached values, everything when no key is given
+    def invalidate(self, *keys):
+        with self.lock:
+            if not keys:
+                self.cache.clear()
+                self.versions.clear()
+            for key in keys:
+                self.cache.pop(key, None)
+                self.versions.pop(key, None)
+
+    # publish a write of this session. Cached values it updated in place stay current,
+    # unless another write was published since they were peeked.
+    def publish(self, table, category=None, updated=()):
+        version = bus.publish(table, self.user_id, category)
+        with self.lock:
+            for key in updated:
+                if self.versions.get(key) == version - 1:
+                    self.versions[key] = version
+
+    # a page of budget lines of one category next to key, the newest page is cached
+    def budget_page(self, kind, key, older, limit):
+        query = select_budget_older if older else select_budget_newer
+        params = (self.user_id, kind) + tuple(key) + (limit,)
+        if older and tuple(key) == PAGE_START and limit == PAGE_SIZE:
+            return self.get(("budget_lines", kind), lambda: execute_read_query(query, params))
+        return execute_read_query(query, params)
+
+    # save budget lines of one category, rows are (date, label, amount, description)
+    def add_budget_lines(self, kind, rows):
+        saved = execute_many_query(insert_budget_line,
+            [(self.user_id, kind) + tuple(row) for row in rows])
+        self.invalidate(("budget_lines", kind))
+        if saved:
+            cube = self.peek("rollup")
+            if cube is not None:
+                for row in rows:
+                    cube.add(TOTALS_BUDGET + kind, row[1], row[2], row[0])
+            self.publish("budget", kind, updated=("rollup",))
+        return saved
+
+    # monthly totals of months first to last (yyyymm)
+    def monthly_totals(self, first, last):
+        return execute_read_query(select_monthly_totals, (self.user_id, first, last))
+
+    # expense budget against expense per category and period in [start, end), None without NumPy.
+    # Months and years of whole months are summed from monthly_totals instead of the ledger rows.
+    def budget_report(self, strt_dt, end_dt, period):
+        np = load_numpy()
+        if np is None:
+            return None
+        months = whole_months(strt_dt, end_dt) if period in ("month", "year") else None
+        if months is not None:
+            budget_rows, actual_rows = self.monthly_amounts(*months)
+        else:
+            budget_rows = execute_read_query(select_budget_amounts,
+                (self.user_id, BUDGET_EXPENSE, strt_dt, end_dt)) or []
+            actual_rows = execute_read_query(select_expense_amounts,
+                (self.user_id, strt_dt, end_dt)) or []
+        categories = {}
+        budget = Ledger.from_rows(np, budget_rows, categories)
+        actual = Ledger.from_rows(np, actual_rows, categories)
+        return BudgetReport(np, budget, actual, list(categories), period)
+
+    # expense budget and expense of months first to last (yyyymm) as (category, amount, date)
+    # rows, one per month and category dated at the start of the month
+    def monthly_amounts(self, first, last):
+        budget = []
+        actual = []
+        for month, kind, category, total, count in self.monthly_totals(first, last) or []:
+            if kind == TOTALS_EXPENSE:
+                actual.append((category, total, month_start(month)))
+            elif kind == TOTALS_BUDGET + BUDGET_EXPENSE:
+                budget.append((category, total, month_start(month)))
+        return budget, actual
+
+    # budget report with its chart, cached until the data changes
+    def budget_summary(self, strt_dt, end_dt, period):
+        return charts.budget_summary(self, strt_dt, end_dt, period)
+
+    # save an expense, date is epoch seconds
+    def add_expense(self, date, exp_type, amount, description):
+        cursor = execute_query(insert_expense,
+            (self.user_id, date, exp_type, amount, description))
+        if cursor is not None:
+            cube = self.peek("rollup")
+            if cube is not None:
+                cube.add(TOTALS_EXPENSE, exp_type, amount, date)
+            daily_spend = self.peek("daily_spend")
+            if daily_spend is not None and date is not None:
+                daily_spend.add(day_number(date), amount.minor if isinstance(amount, Money) else int(amount))
+            self.publish("expense", updated=("rollup", "daily_spend"))
+        return cursor
+
+    # subscription rules, cached until one is saved
+    def subscriptions(self):
+        return self.get("subscriptions",
+            lambda: execute_read_query(select_subscriptions, (self.user_id,)) or [])
+
+    # charges of every subscription in [start, end) in date order, expanded from the rules
+    def subscription_charges(self, strt_dt, end_dt):
+        return merge_subscription_charges(self.subscriptions(), strt_dt, end_dt)
+
+    # the first limit charges in [start, end) and the total of all of them
+    def upcoming_charges(self, strt_dt, end_dt, limit=SUBSCRIPTION_VIEW_ROWS):
+        rows = []
+        total = 0
+        for charge in self.subscription_charges(strt_dt, end_dt):
+            if len(rows) < limit:
+                rows.append(charge)
+            total += charge[3]
+        return rows, total
+
+    # save a subscription rule, dates are epoch seconds and end is exclusive or None
+    def add_subscription(self, sub_type, amount, interval, anchor, sub_end, description):
+        cursor = execute_query(insert_subscription,
+            (self.user_id, sub_type, amount, interval, anchor, sub_end, description))
+        return self.subscription_saved(cursor)
+
+    def update_subscription(self, sub_id, sub_type, amount, interval, anchor, sub_end, description):
+        cursor = execute_query(update_subscription,
+            (sub_type, amount, interval, anchor, sub_end, description, sub_id, self.user_id))
+        return self.subscription_saved(cursor)
+
+    def delete_subscription(self, sub_id):
+        cursor = execute_query(delete_subscription, (sub_id, self.user_id))
+        return self.subscription_saved(cursor)
+
+    # cursor of a subscription write, a row was changed when its rowcount is not 0
+    def subscription_saved(self, cursor):
+        if cursor is not None and cursor.rowcount:
+            self.invalidate("subscriptions")
+            self.publish("subscription")
+        return cursor
+
+    # expense per day in a Fenwick tree, built on first use and kept current by add_expense
+    def daily_spend(self):
+        return self.get("daily_spend", lambda: FenwickTree.from_totals(
+            dict(execute_read_query(select_daily_spend, (self.user_id,)) or [])))
+
+    # expense total of the days first to last (day numbers)
+    def spend_between(self, first_day, last_day):
+        return self.daily_spend().range_sum(first_day, last_day)
+
+    # rollup cube of all expense and budget lines, built on first use and kept current by the add methods
+    def rollup(self):
+        return self.get("rollup", self.load_rollup)
+
+    def load_rollup(self):
+        cube = RollupCube()
+        for category, amount, date in execute_read_query(select_expense_ledger, (self.user_id,)) or []:
+            cube.add(TOTALS_EXPENSE, category, amount, date)
+        for kind, category, amount, date in execute_read_query(select_budget_ledger, (self.user_id,)) or []:
+            cube.add(TOTALS_BUDGET + kind, category, amount, date)
+        return cube
+
+    # drill-down rows of the rollup cube, see RollupCube.drill
+    def rollup_drill(self, kinds, grain=None, period=None):
+        return self.rollup().drill(kinds, grain, period)
+
+    # totals per category of one period of the rollup cube
+    def rollup_categories(self, kinds, grain, period):
+        return self.rollup().categories(kinds, grain, period)
+
+    # export rows of the rollup cube for [start, end), see RollupCube.rows
+    def rollup_rows(self, kinds, strt_dt, end_dt):
+        return self.rollup().rows(kinds, day_number(strt_dt), day_number(end_dt - 1))
+
+
+
+# Decoded images and their Tk photos, shared by every page
+image_cache = {}
+photo_cache = {}
+
+# Function to get a decoded image, each file is decoded once per process.
+# JPEG files are decoded in draft mode at the smallest scale that still covers size.
+def load_image(name, size=None):
+    key = (name, size)
+    image = image_cache.get(key)
+    if image is None:
+        image = Image.open(os.path.join(current_path, name))
+        if size is not None:
+            image.draft("RGB", size)
+        image.load()
+        image_cache[key] = image
+    return image
+
+# Function to get the Tk photo of an image (needs a Tk root)
+def load_photo(name, size=None):
+    key = (name, size)
+    if key not in photo_cache:
+        photo_cache[key] = ImageTk.PhotoImage(load_image(name, size))
+    return photo_cache[key]
+
+# Resized photos shared by every page, least recently used first
+rendition_cache = OrderedDict()
+
+# Function to round a size up to the next bucket so nearby sizes share one rendition
+def bucket_size(width, height, bucket=RESIZE_BUCKET):
+    return (max(bucket, -(-width // bucket) * bucket),
+            max(bucket, -(-height // bucket) * bucket))
+
+# Function to get the Tk photo of an image resized to the bucket that covers size,
+# source_size picks the decoded image it is resized from
+def load_rendition(name, size, source_size=None):
+    key = (name, bucket_size(*size))
+    photo = rendition_cache.get(key)
+    if photo is None:
+        image = load_image(name, source_size).resize(key[1])
+        photo = ImageTk.PhotoImage(image)
+        rendition_cache[key] = photo
+        if len(rendition_cache) > RENDITION_CACHE_SIZE:
+            rendition_cache.popitem(last=False)
+    else:
+        rendition_cache.move_to_end(key)
+    return photo
+
+# Function to get the peak resident memory in MB, None where it is not available
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / 1048576 if sys.platform == "darwin" else peak / 1024
+
+
+
+# Treeview showing a large ordered result one page at a time.
+# fetch(key, older, limit) returns rows starting with (date, id): the rows before
+# key newest first when older is true, the rows after key oldest first otherwise.
+# Pages load on the database worker as the view nears either end and at most
+# window rows stay in the tree, rows scrolled far away are dropped.
+# Items are keyed by id, showing the same query again only applies the changed rows.
+class PagedTreeview(ttk.Treeview):
+    def __init__(self, master, worker, format_row, page_size=PAGE_SIZE, window=PAGE_WINDOW, **kwargs):
+        ttk.Treeview.__init__(self, master, **kwargs)
+        self.worker = worker
+        self.format_row = format_row
+        self.page_size = page_size
+        self.window = max(window, 2 * page_size)
+        self.fetch = None
+        self.query = None
+        self.keys = deque()
+        self.values = {}
+        self.more_older = False
+        self.more_newer = False
+        self.loading = False
+        self.generation = 0
+
+        self.scrollbar = ttk.Scrollbar(master, orient=tk.VERTICAL, command=self.yview)
+        self.configure(yscrollcommand=self.Scrolled)
+
+    # show the rows of fetch, query names the result so a repeated query is refreshed in place
+    def Show(self, fetch, query):
+        self.fetch = fetch
+        if query == self.query and self.keys:
+            self.Refresh()
+        else:
+            self.query = query
+            self.Reset()
+
+    # show the newest page
+    def Reset(self):
+        self.generation += 1
+        self.loading = False
+        self.delete(*self.get_children())
+        self.keys.clear()
+        self.values.clear()
+        self.more_older = True
+        self.more_newer = False
+        self.yview_moveto(0)
+        self.Load(True)
+
+    # fetch the page past the last row (older) or before the first row
+    def Load(self, older):
+        if self.loading or self.fetch is None:
+            return
+        if older:
+            key = self.keys[-1] if self.keys else PAGE_START
+        else:
+            key = self.keys[0]
+        generation = self.generation
+        request = self.worker.submit(self.fetch, key, older, self.page_size,
+            callback=lambda rows: self.AddRows(generation, older, rows), key=self,
+            error=lambda e: self.LoadFailed(generation))
+        self.loading = request is not None
+
+    # a fetch raised, let scrolling or the next refresh try again
+    def LoadFailed(self, generation):
+        if generation != self.generation:
+            return
+        self.loading = False
+        messagebox.showwarning("Database", f"The rows could not be loaded, see {ERROR_LOG}.")
+
+    def AddRows(self, generation, older, rows):
+        if generation != self.generation:
+            return
+        self.loading = False
+        if not rows:
+            if rows is not None:
+                if older:
+                    self.more_older = False
+                else:
+                    self.more_newer = False
+            return
+
+        anchor = self.TopRow()
+        for row in rows:
+            iid = str(row[1])
+            self.values[iid] = self.format_row(row)
+            if older:
+                self.insert('', tk.END, iid=iid, values=self.values[iid])
+                self.keys.append((row[0], row[1]))
+            else:
+                self.insert('', 0, iid=iid, values=self.values[iid])
+                self.keys.appendleft((row[0], row[1]))
+        if older:
+            self.more_older = len(rows) == self.page_size
+        else:
+            self.more_newer = len(rows) == self.page_size
+        self.Trim(older)
+        self.KeepRow(anchor)
+
+    # fetch the rows of the window again and apply only the inserts, updates and deletes
+    def Refresh(self):
+        if not self.keys:
+            self.Reset()
+            return
+        # one past the first row, or the very top when the window starts there
+        first = (self.keys[0][0], self.keys[0][1] + 1) if self.more_newer else PAGE_START
+        last = self.keys[-1] if self.more_older else None
+        limit = len(self.keys) + self.page_size
+        self.generation += 1
+        generation = self.generation
+        request = self.worker.submit(self.fetch, first, True, limit,
+            callback=lambda rows: self.ApplyRows(generation, rows, limit, last), key=self,
+            error=lambda e: self.LoadFailed(generation))
+        self.loading = request is not None
+
+    def ApplyRows(self, generation, rows, limit, last):
+        if generation != self.generation:
+            return
+        self.loading = False
+        if rows is None:
+            return
+        if last is None:
+            self.more_older = len(rows) == limit
+        else:
+            # rows past the old last row are left for scrolling
+            rows = [row for row in rows if (row[0], row[1]) >= tuple(last)]
+
+        anchor = self.TopRow()
+        wanted = set(str(row[1]) for row in rows)
+        for key in self.keys:
+            iid = str(key[1])
+            if iid not in wanted:
+                self.delete(iid)
+                del self.values[iid]
+        order = [str(key[1]) for key in self.keys if str(key[1]) in wanted]
+
+        for index, row in enumerate(rows):
+            iid = str(row[1])
+            values = self.format_row(row)
+            if iid not in self.values:
+                self.insert('', index, iid=iid, values=values)
+                order.insert(index, iid)
+            else:
+                if order[index] != iid:
+                    self.move(iid, '', index)
+                    order.remove(iid)
+                    order.insert(index, iid)
+                if self.values[iid] != values:
+                    self.item(iid, values=values)
+            self.values[iid] = values
+        self.keys = deque((row[0], row[1]) for row in rows)
+        self.Trim(False)
+        self.KeepRow(anchor)
+
+    # drop rows from the far end of the window, the top when older rows were added
+    # and the bottom otherwise
+    def Trim(self, older):
+        while len(self.keys) > self.window:
+            if older:
+                iid = str(self.keys.popleft()[1])
+                self.more_newer = True
+            else:
+                iid = str(self.keys.pop()[1])
+                self.more_older = True
+            self.delete(iid)
+            del self.values[iid]
+
+    # row at the top of the view
+    def TopRow(self):
+        if not self.keys:
+            return None
+        top = int(float(self.yview()[0]) * len(self.keys))
+        return str(self.keys[min(top, len(self.keys) - 1)][1])
+
+    # scroll so row is at the top of the view again
+    def KeepRow(self, iid):
+        if iid is not None and iid in self.values:
+            self.yview_moveto(self.index(iid) / len(self.keys))
+
+    # scrollbar update, load the next page near either end
+    def Scrolled(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= 1 - PAGE_MARGIN and self.more_older:
+            self.Load(True)
+        elif float(first) <= PAGE_MARGIN and self.more_newer:
+            self.Load(False)
+
+# Function to show a (date, id, label, amount, description) row in a table
+def ledger_row(row):
+    return (format_timestamp(row[0]), row[2], Money(row[3]), row[4])
 
 
 
 # Main app
 class MoneyApp(tk.Tk):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, eager_pages=False, **kwargs):
         tk.Tk.__init__(self, *args, **kwargs)
 
         # Window
@@ -122,34 +2141,93 @@ class MoneyApp(tk.Tk):
         # self.wm_attributes("-transparentcolor", 'grey')
 
         # Container
-        container = tk.Frame(self)
-        container.grid(row=0, column=0, sticky="nsew")
-        container.grid_rowconfigure(0, weight = 1)
-        container.grid_columnconfigure(0, weight = 1)
+        self.container = tk.Frame(self)
+        self.container.grid(row=0, column=0, sticky="nsew")
+        self.container.grid_rowconfigure(0, weight = 1)
+        self.container.grid_columnconfigure(0, weight = 1)
+
+        # Logged in user
+        self.session = None
+
+        # Database worker
+        self.worker = DatabaseWorker(self, bus=bus)
+        self.worker.start()
+        self.worker.Poll()
 
-        # Multiple pages
+        # Multiple pages, built the first time they are shown
         self.frames = {}
-        pages = [Login, Register, Menu,
-                BudgetExp, BudgetSub, BudgetInc, BudgetSav, BudgetInv,
-                Summary,
-                ExpenseView, ExpenseAdd, ExpenseUpdate, ExpenseDelete,
-                SubscriptionView, SubscriptionAdd, SubscriptionUpdate, SubscriptionDelete,
-                IncomeView, IncomeAdd, IncomeUpdate, IncomeDelete,
-                SavingView, SavingAdd, SavingUpdate, SavingDelete,
-                InvestView, InvestAdd, InvestUpdate, InvestDelete,
-                Export]
-        for page in pages:
-            frame = page(container, self)
-            self.frames[page] = frame
-            frame.grid(row = 0, column = 0, sticky ="nsew")
+        self.current = None
+        self.subscriptions = []
+        self.prefetch = []
+        self.prefetch_job = None
+        if eager_pages:
+            for page in PAGES:
+                self.BuildFrame(page)
 
         # Starter page
         self.ShowFrame(Login)
 
+    # Start a session for the logged in user
+    def StartSession(self, user_id, username):
+        self.session = Session(user_id, username)
+        # build the daily expense totals while the menu is shown
+        self.worker.submit(self.session.daily_spend)
+        self.ShowFrame(Menu)
+
+    # End the session and go back to the login page
+    def EndSession(self):
+        self.session = None
+        self.ShowFrame(Login)
+
+    # Close database connections together with the window
+    def destroy(self):
+        if self.prefetch_job is not None:
+            self.after_cancel(self.prefetch_job)
+            self.prefetch_job = None
+        for table, callback in self.subscriptions:
+            bus.unsubscribe(table, callback)
+        self.worker.stop()
+        tk.Tk.destroy(self)
+        db.close()
+
+    # Call callback(user_id, category) on changes of table while the app runs
+    def Subscribe(self, table, callback):
+        bus.subscribe(table, callback)
+        self.subscriptions.append((table, callback))
+
+    # Build a page and put it in the container
+    def BuildFrame(self, cont):
+        frame = cont(self.container, self)
+        self.frames[cont] = frame
+        frame.grid(row = 0, column = 0, sticky ="nsew")
+        return frame
+
     # Display the chosen page
     def ShowFrame(self, cont):
-        frame = self.frames[cont]
+        frame = self.frames.get(cont)
+        if frame is None:
+            frame = self.BuildFrame(cont)
         frame.tkraise()
+        self.current = frame
+        if hasattr(frame, "OnShow"):
+            frame.OnShow()
+        self.Prefetch(PREFETCH_PAGES.get(cont, ()))
+
+    # Build the likely next pages while the app is idle, one page per idle call
+    def Prefetch(self, pages):
+        self.prefetch = [page for page in pages if page not in self.frames]
+        if self.prefetch and self.prefetch_job is None:
+            self.prefetch_job = self.after_idle(self.PrefetchNext)
+
+    def PrefetchNext(self):
+        self.prefetch_job = None
+        while self.prefetch:
+            page = self.prefetch.pop(0)
+            if page not in self.frames:
+                self.BuildFrame(page)
+                break
+        if self.prefetch:
+            self.prefetch_job = self.after_idle(self.PrefetchNext)
 
 
 
@@ -158,23 +2236,25 @@ class Background(tk.Frame):
     def __init__(self, master, *args, **kwargs):
         tk.Frame.__init__(master, *args, **kwargs)
 
-        # Add background
-        current_path = os.path.dirname(os.path.abspath(__file__))
-        self.image = Image.open(os.path.join(current_path, 'img/background.jpg'))
-        self.img_copy = self.image.copy()
-        self.background_image = ImageTk.PhotoImage(self.image)
-        self.img_copy = self.image.copy()
-        self.background_image = ImageTk.PhotoImage(self.image)
+        # Add background (decoded once at screen size and shared by all pages)
+        size = (self.winfo_screenwidth(), self.winfo_screenheight())
+        self.image_size = size
+        self.img_copy = load_image(BACKGROUND_IMAGE, size)
+        self.background_image = load_photo(BACKGROUND_IMAGE, size)
         self.lbl_background = tk.Label(self, image=self.background_image, bg="white")
+        self.resize_job = None
         self.lbl_background.bind('<Configure>', self.Resizing)
         self.lbl_background.place(x=0, y=0, relwidth=1, relheight=1)
 
-    # Resize background image responding to window size
+    # Resize background image responding to window size, once the size settles
     def Resizing(self, event):
-        new_width = event.width
-        new_height = event.height
-        self.image = self.img_copy.resize((new_width, new_height))
-        self.background_image = ImageTk.PhotoImage(self.image)
+        if self.resize_job is not None:
+            self.after_cancel(self.resize_job)
+        self.resize_job = self.after(RESIZE_DELAY_MS, self.ApplySize, event.width, event.height)
+
+    def ApplySize(self, width, height):
+        self.resize_job = None
+        self.background_image = load_rendition(BACKGROUND_IMAGE, (width, height), self.image_size)
         self.lbl_background.config(image = self.background_image)
         self.lbl_background.image = self.background_image
 
@@ -235,33 +2315,43 @@ class Login(Background):
             pady=10)
 
     def LoginSystem(self):
-        # to futher use
-        global input_user
-        global input_id
-
         # get user's input
-        input_user = self.ent_user.get()
-        input_pwd = self.ent_pass.get()
+        username = self.ent_user.get()
+        password = self.ent_pass.get()
+
+        # check user & password on the database worker
+        self.controller.worker.submit(self.CheckUser, username, password,
+            callback=lambda result: self.LoginResult(username, result), key="login")
 
-        # get user's database
-        select_users = "SELECT * FROM users"
-        users = execute_read_query(select_users)
+    # runs on the database worker, must not touch widgets
+    def CheckUser(self, username, password):
+        # get the user by the username index
+        select_user = "SELECT user_id, password FROM users WHERE username = ?"
+        users = execute_read_query(select_user, (username,))
 
         # check user & password
-        for user in users:
-            if input_user == user[1]:
-                if input_pwd == user[2]:
-                    # get user id
-                    select_user_id = f"SELECT user_id FROM users WHERE username = '{input_user}'"
-                    users_id = execute_read_query(select_user_id)
-                    input_id = users_id[0][0]
-
-                    # login success
-                    self.controller.ShowFrame(Menu)
-                    self.ClearText()
-                    return None
-                messagebox.showwarning("Login", "Your password may be incorrect.")
-        messagebox.showwarning("Login", "Your username may be incorrect.")
+        if not users:
+            return "username", None
+        user_id, user_password = users[0]
+        if not verify_password(password, user_password):
+            return "password", None
+
+        # hash again when it was stored with a lower cost (or in plaintext)
+        if needs_rehash(user_password):
+            update_password = "UPDATE users SET password = ? WHERE user_id = ?"
+            execute_query(update_password, (hash_password(password), user_id))
+        return "success", user_id
+
+    def LoginResult(self, username, result):
+        status, user_id = result
+        if status == "success":
+            # login success
+            self.controller.StartSession(user_id, username)
+            self.ClearText()
+        elif status == "password":
+            messagebox.showwarning("Login", "Your password may be incorrect.")
+        else:
+            messagebox.showwarning("Login", "Your username may be incorrect.")
 
     def ClearText(self):
         self.ent_user.delete(0, tk.END)
@@ -273,6 +2363,9 @@ class Register(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         # Label
         self.lbl_register = tk.Label(self, text="Register",
             bg=COLOR_1, fg=COLOR_3, font=FONT_HEAD)
@@ -341,26 +2434,37 @@ class Register(Background):
         input_pwd = self.ent_pass.get()
         input_repwd = self.ent_repass.get()
 
+        # check and save the user on the database worker
+        self.controller.worker.submit(self.SaveUser, input_user, input_pwd, input_repwd,
+            callback=self.RegisterResult)
+
+    # runs on the database worker, must not touch widgets
+    def SaveUser(self, input_user, input_pwd, input_repwd):
         # checking status
         check = {"user": False, "password": False}
 
-        # check user's duplication (input vs DB)
-        select_username = "SELECT username FROM users"
-        users = execute_read_query(select_username)
-        username_list = [input_user != user[0] for user in users]
-        check["user"] = True if all(username_list) else False
-
         # check pwd vs repwd
         check["password"] = True if input_pwd == input_repwd else False
 
+        if check["password"] == True:
+            # register, a taken username inserts nothing
+            insert_users = """
+            INSERT INTO users (username, password)
+            VALUES (?, ?)
+            ON CONFLICT (username) DO NOTHING;
+            """
+            cursor = execute_query(insert_users, (input_user, hash_password(input_pwd)))
+            check["user"] = True if cursor is not None and cursor.rowcount == 1 else False
+        else:
+            # check user's duplication (input vs DB) for the message
+            select_username = "SELECT 1 FROM users WHERE username = ?"
+            check["user"] = False if execute_read_query(select_username, (input_user,)) else True
+        return check
+
+    def RegisterResult(self, check):
         # final check
         if check["user"] == True and check["password"] == True:
             # register success
-            insert_users = f"""
-            INSERT INTO users (username, password)
-            VALUES ('{input_user}', '{input_pwd}');
-            """
-            execute_query(insert_users)
             self.ClearText()
             messagebox.showinfo("Registration", "Register completed!")
         elif check["user"] == False and check["password"] == True:
@@ -442,7 +2546,7 @@ class Menu(Background):
             font=FONT_M, relief="ridge",
             activebackground=COLOR_4, activeforeground=COLOR_1,
             width=7,
-            command=lambda:controller.ShowFrame(Login))
+            command=lambda:controller.EndSession())
 
         btn_budget.grid(row=2, column=1,
             ipadx=10,
@@ -484,6 +2588,9 @@ class BudgetExp(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         self.lbl_budget = tk.Label(self, text="Budget",
@@ -629,11 +2736,11 @@ class BudgetExp(Background):
 
         # Table
         columns = ('date', 'type', 'amount', 'description')
-        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree = PagedTreeview(self, controller.worker, ledger_row,
+            columns=columns, show="headings")
         self.tree.grid(row=7, column=2, columnspan=3, sticky="nsew")
 
-        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=self.scrollbar.set)
+        self.scrollbar = self.tree.scrollbar
         self.scrollbar.grid(row=7, column=5, sticky="ns")
 
         self.tree.heading('date', text='Date', anchor=tk.CENTER)
@@ -652,6 +2759,10 @@ class BudgetExp(Background):
         self.tree.column('description', width=100, minwidth=100,
             anchor=tk.CENTER, stretch=False)
 
+        # Refresh on data changes
+        self.dirty = True
+        controller.Subscribe("budget", self.DataChanged)
+
     def SubmitBudgetExp(self):
         # get user input
         input1 = {}
@@ -675,33 +2786,21 @@ class BudgetExp(Background):
             (input2["type"] and input2["amount"]) or \
             (input3["type"] and input3["amount"]):
             # get the current datetime
-            CurrentDateTime = datetime.datetime.now()
-            CurrentDateTime = CurrentDateTime.strftime("%Y-%m-%d %H:%M:%S")
+            CurrentDateTime = now_timestamp()
             # insert data
-            if (input1["type"] and input1["amount"]):
-                insert_budget1 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_exp_type, bg_exp_amt, bg_description)
-                VALUES ({input_id}, '{CurrentDateTime}', '{input1["type"]}', {float(input1["amount"])}, '{input1["description"]}');
-                """
-                execute_query(insert_budget1)
-            if (input2["type"] and input2["amount"]):
-                insert_budget2 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_exp_type, bg_exp_amt, bg_description)
-                VALUES ({input_id}, '{CurrentDateTime}', '{input2["type"]}', {float(input2["amount"])}, '{input2["description"]}');
-                """
-                execute_query(insert_budget2)
-            if (input3["type"] and input3["amount"]):
-                insert_budget3 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_exp_type, bg_exp_amt, bg_description)
-                VALUES ({int(input_id)}, '{CurrentDateTime}', '{input3["type"]}', {float(input3["amount"])}, '{input3["description"]}');
-                """
-                execute_query(insert_budget3)
-
-            # clear entire table
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-            # Show budget data
-            self.DisplayTable()
+            try:
+                rows = []
+                if (input1["type"] and input1["amount"]):
+                    rows.append((CurrentDateTime, input1["type"], Money.parse(input1["amount"]), input1["description"]))
+                if (input2["type"] and input2["amount"]):
+                    rows.append((CurrentDateTime, input2["type"], Money.parse(input2["amount"]), input2["description"]))
+                if (input3["type"] and input3["amount"]):
+                    rows.append((CurrentDateTime, input3["type"], Money.parse(input3["amount"]), input3["description"]))
+            except ValueError:
+                messagebox.showwarning("Budget Setup", "Please enter amount as a number.")
+                return None
+            # Save, the table refreshes from the data change event
+            self.controller.worker.submit(self.controller.session.add_budget_lines, BUDGET_EXPENSE, rows)
         else:
             messagebox.showwarning("Budget Setup", "Please enter your budget.")
 
@@ -719,22 +2818,30 @@ class BudgetExp(Background):
         self.ent_description3.delete(0, tk.END)
 
     def DisplayTable(self):
-        # get data from budget
-        select_budget = f"""SELECT bg_date, bg_exp_type, bg_exp_amt, bg_description FROM budget
-        WHERE user_id = {input_id}
-        AND bg_exp_type is not null AND bg_exp_amt is not null
-        ORDER BY bg_date DESC LIMIT 100
-        """
-        budgets = execute_read_query(select_budget)
-
-        # add data to table
-        for budget in budgets:
-            self.tree.insert('', tk.END, values=budget)
+        # page through budget lines on the database worker, a refresh only updates changed rows
+        session = self.controller.session
+        self.tree.Show(functools.partial(session.budget_page, BUDGET_EXPENSE), (session, BUDGET_EXPENSE))
+
+    # Budget lines changed, refresh now when shown or else when raised
+    def DataChanged(self, user_id, category):
+        session = self.controller.session
+        if session is not None and session.user_id == user_id and category == BUDGET_EXPENSE:
+            self.dirty = True
+            if self.controller.current is self:
+                self.OnShow()
+
+    def OnShow(self):
+        if self.dirty or self.tree.query != (self.controller.session, BUDGET_EXPENSE):
+            self.dirty = False
+            self.DisplayTable()
 
 class BudgetSub(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         self.lbl_budget = tk.Label(self, text="Budget",
@@ -880,11 +2987,11 @@ class BudgetSub(Background):
 
         # Table
         columns = ('date', 'type', 'amount', 'description')
-        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree = PagedTreeview(self, controller.worker, ledger_row,
+            columns=columns, show="headings")
         self.tree.grid(row=7, column=2, columnspan=3, sticky="nsew")
 
-        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=self.scrollbar.set)
+        self.scrollbar = self.tree.scrollbar
         self.scrollbar.grid(row=7, column=5, sticky="ns")
 
         self.tree.heading('date', text='Date', anchor=tk.CENTER)
@@ -903,6 +3010,10 @@ class BudgetSub(Background):
         self.tree.column('description', width=100, minwidth=100,
             anchor=tk.CENTER, stretch=False)
 
+        # Refresh on data changes
+        self.dirty = True
+        controller.Subscribe("budget", self.DataChanged)
+
     def SubmitBudgetSub(self):
         # get user input
         input1 = {}
@@ -926,33 +3037,21 @@ class BudgetSub(Background):
             (input2["type"] and input2["amount"]) or \
             (input3["type"] and input3["amount"]):
             # get the current datetime
-            CurrentDateTime = datetime.datetime.now()
-            CurrentDateTime = CurrentDateTime.strftime("%Y-%m-%d %H:%M:%S")
+            CurrentDateTime = now_timestamp()
             # insert data
-            if (input1["type"] and input1["amount"]):
-                insert_budget1 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_sub_type, bg_sub_amt, bg_description)
-                VALUES ({input_id}, '{CurrentDateTime}', '{input1["type"]}', {float(input1["amount"])}, '{input1["description"]}');
-                """
-                execute_query(insert_budget1)
-            if (input2["type"] and input2["amount"]):
-                insert_budget2 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_sub_type, bg_sub_amt, bg_description)
-                VALUES ({input_id}, '{CurrentDateTime}', '{input2["type"]}', {float(input2["amount"])}, '{input2["description"]}');
-                """
-                execute_query(insert_budget2)
-            if (input3["type"] and input3["amount"]):
-                insert_budget3 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_sub_type, bg_sub_amt, bg_description)
-                VALUES ({int(input_id)}, '{CurrentDateTime}', '{input3["type"]}', {float(input3["amount"])}, '{input3["description"]}');
-                """
-                execute_query(insert_budget3)
-
-            # clear entire table
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-            # Show budget data
-            self.DisplayTable()
+            try:
+                rows = []
+                if (input1["type"] and input1["amount"]):
+                    rows.append((CurrentDateTime, input1["type"], Money.parse(input1["amount"]), input1["description"]))
+                if (input2["type"] and input2["amount"]):
+                    rows.append((CurrentDateTime, input2["type"], Money.parse(input2["amount"]), input2["description"]))
+                if (input3["type"] and input3["amount"]):
+                    rows.append((CurrentDateTime, input3["type"], Money.parse(input3["amount"]), input3["description"]))
+            except ValueError:
+                messagebox.showwarning("Budget Setup", "Please enter amount as a number.")
+                return None
+            # Save, the table refreshes from the data change event
+            self.controller.worker.submit(self.controller.session.add_budget_lines, BUDGET_SUBSCRIPTION, rows)
         else:
             messagebox.showwarning("Budget Setup", "Please enter your budget.")
 
@@ -970,22 +3069,30 @@ class BudgetSub(Background):
         self.ent_description3.delete(0, tk.END)
 
     def DisplayTable(self):
-        # get data from budget
-        select_budget = f"""SELECT bg_date, bg_sub_type, bg_sub_amt, bg_description FROM budget
-        WHERE user_id = {input_id}
-        AND bg_sub_type is not null AND bg_sub_amt is not null
-        ORDER BY bg_date DESC LIMIT 100
-        """
-        budgets = execute_read_query(select_budget)
-
-        # add data to table
-        for budget in budgets:
-            self.tree.insert('', tk.END, values=budget)
+        # page through budget lines on the database worker, a refresh only updates changed rows
+        session = self.controller.session
+        self.tree.Show(functools.partial(session.budget_page, BUDGET_SUBSCRIPTION), (session, BUDGET_SUBSCRIPTION))
+
+    # Budget lines changed, refresh now when shown or else when raised
+    def DataChanged(self, user_id, category):
+        session = self.controller.session
+        if session is not None and session.user_id == user_id and category == BUDGET_SUBSCRIPTION:
+            self.dirty = True
+            if self.controller.current is self:
+                self.OnShow()
+
+    def OnShow(self):
+        if self.dirty or self.tree.query != (self.controller.session, BUDGET_SUBSCRIPTION):
+            self.dirty = False
+            self.DisplayTable()
 
 class BudgetInc(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         self.lbl_budget = tk.Label(self, text="Budget",
@@ -1093,11 +3200,11 @@ class BudgetInc(Background):
 
         # Table
         columns = ('date', 'type', 'amount', 'description')
-        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree = PagedTreeview(self, controller.worker, ledger_row,
+            columns=columns, show="headings")
         self.tree.grid(row=7, column=2, columnspan=3, sticky="nsew")
 
-        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=self.scrollbar.set)
+        self.scrollbar = self.tree.scrollbar
         self.scrollbar.grid(row=7, column=5, sticky="ns")
 
         self.tree.heading('date', text='Date', anchor=tk.CENTER)
@@ -1116,6 +3223,10 @@ class BudgetInc(Background):
         self.tree.column('description', width=100, minwidth=100,
             anchor=tk.CENTER, stretch=False)
 
+        # Refresh on data changes
+        self.dirty = True
+        controller.Subscribe("budget", self.DataChanged)
+
     def SubmitBudgetInc(self):
         # get user input
         input1 = {}
@@ -1126,21 +3237,17 @@ class BudgetInc(Background):
         # check user input
         if (input1["type"] and input1["amount"]):
             # get the current datetime
-            CurrentDateTime = datetime.datetime.now()
-            CurrentDateTime = CurrentDateTime.strftime("%Y-%m-%d %H:%M:%S")
+            CurrentDateTime = now_timestamp()
             # insert data
-            if (input1["type"] and input1["amount"]):
-                insert_budget1 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_inc_type, bg_inc_amt, bg_description)
-                VALUES ({input_id}, '{CurrentDateTime}', '{input1["type"]}', {float(input1["amount"])}, '{input1["description"]}');
-                """
-                execute_query(insert_budget1)
-
-            # clear entire table
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-            # Show budget data
-            self.DisplayTable()
+            try:
+                rows = []
+                if (input1["type"] and input1["amount"]):
+                    rows.append((CurrentDateTime, input1["type"], Money.parse(input1["amount"]), input1["description"]))
+            except ValueError:
+                messagebox.showwarning("Budget Setup", "Please enter amount as a number.")
+                return None
+            # Save, the table refreshes from the data change event
+            self.controller.worker.submit(self.controller.session.add_budget_lines, BUDGET_INCOME, rows)
         else:
             messagebox.showwarning("Budget Setup", "Please enter your budget.")
 
@@ -1150,22 +3257,30 @@ class BudgetInc(Background):
         self.ent_description1.delete(0, tk.END)
 
     def DisplayTable(self):
-        # get data from budget
-        select_budget = f"""SELECT bg_date, bg_inc_type, bg_inc_amt, bg_description FROM budget
-        WHERE user_id = {input_id}
-        AND bg_inc_type is not null AND bg_inc_amt is not null
-        ORDER BY bg_date DESC LIMIT 100
-        """
-        budgets = execute_read_query(select_budget)
-
-        # add data to table
-        for budget in budgets:
-            self.tree.insert('', tk.END, values=budget)
+        # page through budget lines on the database worker, a refresh only updates changed rows
+        session = self.controller.session
+        self.tree.Show(functools.partial(session.budget_page, BUDGET_INCOME), (session, BUDGET_INCOME))
+
+    # Budget lines changed, refresh now when shown or else when raised
+    def DataChanged(self, user_id, category):
+        session = self.controller.session
+        if session is not None and session.user_id == user_id and category == BUDGET_INCOME:
+            self.dirty = True
+            if self.controller.current is self:
+                self.OnShow()
+
+    def OnShow(self):
+        if self.dirty or self.tree.query != (self.controller.session, BUDGET_INCOME):
+            self.dirty = False
+            self.DisplayTable()
 
 class BudgetSav(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         self.lbl_budget = tk.Label(self, text="Budget",
@@ -1311,11 +3426,11 @@ class BudgetSav(Background):
 
         # Table
         columns = ('date', 'group', 'amount', 'description')
-        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree = PagedTreeview(self, controller.worker, ledger_row,
+            columns=columns, show="headings")
         self.tree.grid(row=7, column=2, columnspan=3, sticky="nsew")
 
-        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=self.scrollbar.set)
+        self.scrollbar = self.tree.scrollbar
         self.scrollbar.grid(row=7, column=5, sticky="ns")
 
         self.tree.heading('date', text='Date', anchor=tk.CENTER)
@@ -1334,6 +3449,10 @@ class BudgetSav(Background):
         self.tree.column('description', width=100, minwidth=100,
             anchor=tk.CENTER, stretch=False)
 
+        # Refresh on data changes
+        self.dirty = True
+        controller.Subscribe("budget", self.DataChanged)
+
     def SubmitBudgetSav(self):
         # get user input
         input1 = {}
@@ -1357,33 +3476,21 @@ class BudgetSav(Background):
             (input2["group"] and input2["amount"]) or \
             (input3["group"] and input3["amount"]):
             # get the current datetime
-            CurrentDateTime = datetime.datetime.now()
-            CurrentDateTime = CurrentDateTime.strftime("%Y-%m-%d %H:%M:%S")
+            CurrentDateTime = now_timestamp()
             # insert data
-            if (input1["group"] and input1["amount"]):
-                insert_budget1 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_sav_group, bg_sav_amt, bg_description)
-                VALUES ({input_id}, '{CurrentDateTime}', '{input1["group"]}', {float(input1["amount"])}, '{input1["description"]}');
-                """
-                execute_query(insert_budget1)
-            if (input2["group"] and input2["amount"]):
-                insert_budget2 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_sav_group, bg_sav_amt, bg_description)
-                VALUES ({input_id}, '{CurrentDateTime}', '{input2["group"]}', {float(input2["amount"])}, '{input2["description"]}');
-                """
-                execute_query(insert_budget2)
-            if (input3["group"] and input3["amount"]):
-                insert_budget3 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_sav_group, bg_sav_amt, bg_description)
-                VALUES ({int(input_id)}, '{CurrentDateTime}', '{input3["group"]}', {float(input3["amount"])}, '{input3["description"]}');
-                """
-                execute_query(insert_budget3)
-
-            # clear entire table
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-            # Show budget data
-            self.DisplayTable()
+            try:
+                rows = []
+                if (input1["group"] and input1["amount"]):
+                    rows.append((CurrentDateTime, input1["group"], Money.parse(input1["amount"]), input1["description"]))
+                if (input2["group"] and input2["amount"]):
+                    rows.append((CurrentDateTime, input2["group"], Money.parse(input2["amount"]), input2["description"]))
+                if (input3["group"] and input3["amount"]):
+                    rows.append((CurrentDateTime, input3["group"], Money.parse(input3["amount"]), input3["description"]))
+            except ValueError:
+                messagebox.showwarning("Budget Setup", "Please enter amount as a number.")
+                return None
+            # Save, the table refreshes from the data change event
+            self.controller.worker.submit(self.controller.session.add_budget_lines, BUDGET_SAVING, rows)
         else:
             messagebox.showwarning("Budget Setup", "Please enter your budget.")
 
@@ -1401,22 +3508,30 @@ class BudgetSav(Background):
         self.ent_description3.delete(0, tk.END)
 
     def DisplayTable(self):
-        # get data from budget
-        select_budget = f"""SELECT bg_date, bg_sav_group, bg_sav_amt, bg_description FROM budget
-        WHERE user_id = {input_id}
-        AND bg_sav_group is not null AND bg_sav_amt is not null
-        ORDER BY bg_date DESC LIMIT 100
-        """
-        budgets = execute_read_query(select_budget)
-
-        # add data to table
-        for budget in budgets:
-            self.tree.insert('', tk.END, values=budget)
+        # page through budget lines on the database worker, a refresh only updates changed rows
+        session = self.controller.session
+        self.tree.Show(functools.partial(session.budget_page, BUDGET_SAVING), (session, BUDGET_SAVING))
+
+    # Budget lines changed, refresh now when shown or else when raised
+    def DataChanged(self, user_id, category):
+        session = self.controller.session
+        if session is not None and session.user_id == user_id and category == BUDGET_SAVING:
+            self.dirty = True
+            if self.controller.current is self:
+                self.OnShow()
+
+    def OnShow(self):
+        if self.dirty or self.tree.query != (self.controller.session, BUDGET_SAVING):
+            self.dirty = False
+            self.DisplayTable()
 
 class BudgetInv(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         self.lbl_budget = tk.Label(self, text="Budget",
@@ -1563,11 +3678,11 @@ class BudgetInv(Background):
 
         # Table
         columns = ('date', 'purpose', 'amount', 'description')
-        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree = PagedTreeview(self, controller.worker, ledger_row,
+            columns=columns, show="headings")
         self.tree.grid(row=7, column=2, columnspan=3, sticky="nsew")
 
-        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=self.scrollbar.set)
+        self.scrollbar = self.tree.scrollbar
         self.scrollbar.grid(row=7, column=5, sticky="ns")
 
         self.tree.heading('date', text='Date', anchor=tk.CENTER)
@@ -1586,6 +3701,10 @@ class BudgetInv(Background):
         self.tree.column('description', width=100, minwidth=100,
             anchor=tk.CENTER, stretch=False)
 
+        # Refresh on data changes
+        self.dirty = True
+        controller.Subscribe("budget", self.DataChanged)
+
     def SubmitBudgetInv(self):
         # get user input
         input1 = {}
@@ -1609,33 +3728,21 @@ class BudgetInv(Background):
             (input2["purpose"] and input2["amount"]) or \
             (input3["purpose"] and input3["amount"]):
             # get the current datetime
-            CurrentDateTime = datetime.datetime.now()
-            CurrentDateTime = CurrentDateTime.strftime("%Y-%m-%d %H:%M:%S")
+            CurrentDateTime = now_timestamp()
             # insert data
-            if (input1["purpose"] and input1["amount"]):
-                insert_budget1 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_inv_purpose, bg_inv_amt, bg_description)
-                VALUES ({input_id}, '{CurrentDateTime}', '{input1["purpose"]}', {float(input1["amount"])}, '{input1["description"]}');
-                """
-                execute_query(insert_budget1)
-            if (input2["purpose"] and input2["amount"]):
-                insert_budget2 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_inv_purpose, bg_inv_amt, bg_description)
-                VALUES ({input_id}, '{CurrentDateTime}', '{input2["purpose"]}', {float(input2["amount"])}, '{input2["description"]}');
-                """
-                execute_query(insert_budget2)
-            if (input3["purpose"] and input3["amount"]):
-                insert_budget3 = f"""
-                INSERT INTO budget (user_id, bg_date, bg_inv_purpose, bg_inv_amt, bg_description)
-                VALUES ({int(input_id)}, '{CurrentDateTime}', '{input3["purpose"]}', {float(input3["amount"])}, '{input3["description"]}');
-                """
-                execute_query(insert_budget3)
-
-            # clear entire table
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-            # Show budget data
-            self.DisplayTable()
+            try:
+                rows = []
+                if (input1["purpose"] and input1["amount"]):
+                    rows.append((CurrentDateTime, input1["purpose"], Money.parse(input1["amount"]), input1["description"]))
+                if (input2["purpose"] and input2["amount"]):
+                    rows.append((CurrentDateTime, input2["purpose"], Money.parse(input2["amount"]), input2["description"]))
+                if (input3["purpose"] and input3["amount"]):
+                    rows.append((CurrentDateTime, input3["purpose"], Money.parse(input3["amount"]), input3["description"]))
+            except ValueError:
+                messagebox.showwarning("Budget Setup", "Please enter amount as a number.")
+                return None
+            # Save, the table refreshes from the data change event
+            self.controller.worker.submit(self.controller.session.add_budget_lines, BUDGET_INVEST, rows)
         else:
             messagebox.showwarning("Budget Setup", "Please enter your budget.")
 
@@ -1653,17 +3760,22 @@ class BudgetInv(Background):
         self.ent_description3.delete(0, tk.END)
 
     def DisplayTable(self):
-        # get data from budget
-        select_budget = f"""SELECT bg_date, bg_inv_purpose, bg_inv_amt, bg_description FROM budget
-        WHERE user_id = {input_id}
-        AND bg_inv_purpose is not null AND bg_inv_amt is not null
-        ORDER BY bg_date DESC LIMIT 100
-        """
-        budgets = execute_read_query(select_budget)
-
-        # add data to table
-        for budget in budgets:
-            self.tree.insert('', tk.END, values=budget)
+        # page through budget lines on the database worker, a refresh only updates changed rows
+        session = self.controller.session
+        self.tree.Show(functools.partial(session.budget_page, BUDGET_INVEST), (session, BUDGET_INVEST))
+
+    # Budget lines changed, refresh now when shown or else when raised
+    def DataChanged(self, user_id, category):
+        session = self.controller.session
+        if session is not None and session.user_id == user_id and category == BUDGET_INVEST:
+            self.dirty = True
+            if self.controller.current is self:
+                self.OnShow()
+
+    def OnShow(self):
+        if self.dirty or self.tree.query != (self.controller.session, BUDGET_INVEST):
+            self.dirty = False
+            self.DisplayTable()
 
 
 
@@ -1671,6 +3783,9 @@ class Summary(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         # Label
         lbl_summary = tk.Label(self, text="Summary",
             bg=COLOR_1, fg=COLOR_3, font=FONT_HEAD)
@@ -1689,15 +3804,15 @@ class Summary(Background):
         lbl_periodicity.grid(row=3, column=1, sticky="e")
 
         # Entry
-        ent_strt_dt = tk.Entry(self, font=FONT_M,
+        self.ent_strt_dt = tk.Entry(self, font=FONT_M,
             width=12)
-        ent_end_dt = tk.Entry(self, font=FONT_M,
+        self.ent_end_dt = tk.Entry(self, font=FONT_M,
             width=12)
 
-        ent_strt_dt.grid(row=2, column=2,
+        self.ent_strt_dt.grid(row=2, column=2,
             ipadx=3, ipady=3,
             padx=(15,0))
-        ent_end_dt.grid(row=2, column=4,
+        self.ent_end_dt.grid(row=2, column=4,
             ipadx=3, ipady=3,
             padx=(5,0))
 
@@ -1706,12 +3821,12 @@ class Summary(Background):
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
+            command=lambda:self.SubmitSummary())
         btn_cancel = tk.Button(self, text="Cancel",
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
+            command=lambda:self.ClearText())
         btn_back = tk.Button(self, text="<< Menu",
             font=FONT_M, relief="ridge",
             activebackground=COLOR_4, activeforeground=COLOR_1,
@@ -1726,30 +3841,30 @@ class Summary(Background):
             padx=(15,0), pady=(15,0))
 
         # Checkbox
-        var_expense = tk.IntVar()
-        var_subscription = tk.IntVar()
-        var_saving = tk.IntVar()
-        var_invest = tk.IntVar()
-        var_income = tk.IntVar()
-        var_budget = tk.IntVar()
+        self.var_expense = tk.IntVar()
+        self.var_subscription = tk.IntVar()
+        self.var_saving = tk.IntVar()
+        self.var_invest = tk.IntVar()
+        self.var_income = tk.IntVar()
+        self.var_budget = tk.IntVar()
 
         chk_expense = tk.Checkbutton(self, text="Expense",
-                                justify="left", variable=var_expense,
+                                justify="left", variable=self.var_expense,
                                 bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         chk_subscription = tk.Checkbutton(self, text="Subscription",
-                                justify="left", variable=var_subscription,
+                                justify="left", variable=self.var_subscription,
                                 bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         chk_saving = tk.Checkbutton(self, text="Saving",
-                                justify="left", variable=var_saving,
+                                justify="left", variable=self.var_saving,
                                 bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         chk_invest = tk.Checkbutton(self, text="Invest",
-                                justify="left", variable=var_invest,
+                                justify="left", variable=self.var_invest,
                                 bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         chk_income = tk.Checkbutton(self, text="Income",
-                                justify="left", variable=var_income,
+                                justify="left", variable=self.var_income,
                                 bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         chk_budget = tk.Checkbutton(self, text="Budget",
-                                justify="left", variable=var_budget,
+                                justify="left", variable=self.var_budget,
                                 bg=COLOR_3, fg=COLOR_1, font=FONT_M)
 
         chk_expense.grid(row=2, column=0, sticky="w",
@@ -1766,15 +3881,187 @@ class Summary(Background):
             padx=(30,0), pady=(5,0))
 
         # Optionmenu
-        OPTIONS = ["Daily", "Monthly", "Yearly"]
-        var_default = tk.StringVar()
-        var_default.set(OPTIONS[1])
+        OPTIONS = list(SUMMARY_PERIODS)
+        self.var_periodicity = tk.StringVar()
+        self.var_periodicity.set("Monthly")
 
-        opt_periodicity = tk.OptionMenu(self, var_default, *OPTIONS)
+        opt_periodicity = tk.OptionMenu(self, self.var_periodicity, *OPTIONS)
         opt_periodicity.config(bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         opt_periodicity.grid(row=3, column=2)
 
+        # Table: expense budget against expense
+        columns = ('period', 'category', 'budget', 'actual', 'variance', 'used', 'overspend')
+        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree.grid(row=4, column=1, columnspan=5, rowspan=4, sticky="nsew",
+            padx=(15,0), pady=(15,0))
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscroll=self.scrollbar.set)
+        self.scrollbar.grid(row=4, column=6, rowspan=4, sticky="ns", pady=(15,0))
+
+        for column, text, width in [('period', 'Period', 110), ('category', 'Category', 100),
+                ('budget', 'Budget', 80), ('actual', 'Actual', 80), ('variance', 'Variance', 80),
+                ('used', 'Used', 60), ('overspend', 'Overspend', 80)]:
+            self.tree.heading(column, text=text, anchor=tk.CENTER)
+            self.tree.column(column, width=width, minwidth=width,
+                anchor=tk.CENTER, stretch=False)
+
+        # Tree: totals of the checked kinds, drilled down from years when opened
+        self.drill_tree = ttk.Treeview(self, columns=('total', 'count'), show="tree headings", height=6)
+        self.drill_tree.grid(row=8, column=1, columnspan=5, sticky="nsew",
+            padx=(15,0), pady=(15,0))
+        self.drill_tree.bind("<<TreeviewOpen>>", self.OpenPeriod)
+        self.drill_kinds = []
+        self.drill_periods = {}
+        self.drill_opened = set()
+
+        self.drill_tree.heading('#0', text='Period', anchor=tk.CENTER)
+        self.drill_tree.column('#0', width=250, minwidth=150)
+        self.drill_tree.heading('total', text='Total', anchor=tk.CENTER)
+        self.drill_tree.column('total', width=100, minwidth=100,
+            anchor=tk.CENTER, stretch=False)
+        self.drill_tree.heading('count', text='Count', anchor=tk.CENTER)
+        self.drill_tree.column('count', width=80, minwidth=80,
+            anchor=tk.CENTER, stretch=False)
+
         # Graph
+        self.lbl_graph = tk.Label(self, text="", bg=COLOR_1, fg=COLOR_4, font=FONT_M)
+        self.lbl_graph.grid(row=9, column=1, columnspan=5, padx=(15,0), pady=(15,0))
+        self.graph_image = None
+
+        # Refresh on data changes
+        self.summary = None
+        self.dirty = False
+        controller.Subscribe("expense", self.DataChanged)
+        controller.Subscribe("budget", self.DataChanged)
+
+    # Kinds of the rollup cube for the checked boxes, expense when none is checked
+    def CheckedKinds(self):
+        checks = [(self.var_expense, TOTALS_EXPENSE),
+            (self.var_subscription, TOTALS_BUDGET + BUDGET_SUBSCRIPTION),
+            (self.var_saving, TOTALS_BUDGET + BUDGET_SAVING),
+            (self.var_invest, TOTALS_BUDGET + BUDGET_INVEST),
+            (self.var_income, TOTALS_BUDGET + BUDGET_INCOME),
+            (self.var_budget, TOTALS_BUDGET + BUDGET_EXPENSE)]
+        return [kind for var, kind in checks if var.get()] or [TOTALS_EXPENSE]
+
+    def SubmitSummary(self):
+        # get user input
+        input1 = {}
+        input1["start_date"] = self.ent_strt_dt.get()
+        input1["end_date"] = self.ent_end_dt.get()
+
+        # check user input
+        if not (input1["start_date"] and input1["end_date"] and \
+            re.findall("^\d{4}-\d{2}-\d{2}$", input1["start_date"]) and \
+            re.findall("^\d{4}-\d{2}-\d{2}$", input1["end_date"])):
+            messagebox.showwarning("Summary", "Please enter date as yyyy-mm-dd.")
+            return None
+        try:
+            strt_dt, end_dt = date_range_bounds(input1["start_date"], input1["end_date"])
+        except ValueError:
+            messagebox.showwarning("Summary", "Please enter date as yyyy-mm-dd.")
+            return None
+        if load_numpy() is None:
+            messagebox.showwarning("Summary", "The summary needs NumPy, install it with: pip install numpy")
+            return None
+
+        self.summary = (self.controller.session, strt_dt, end_dt, SUMMARY_PERIODS[self.var_periodicity.get()])
+        self.drill_kinds = self.CheckedKinds()
+        self.DisplaySummary()
+
+    def DisplaySummary(self):
+        session, strt_dt, end_dt, period = self.summary
+        self.dirty = False
+
+        # compute budget against actual and its graph on the database worker
+        self.controller.worker.submit(session.budget_summary, strt_dt, end_dt, period,
+            callback=self.FillTable, key=self)
+
+        # years of the drill-down tree
+        self.drill_periods = {}
+        self.drill_opened = set()
+        self.drill_tree.delete(*self.drill_tree.get_children())
+        self.controller.worker.submit(session.rollup_drill, self.drill_kinds,
+            callback=lambda rows: self.FillPeriod('', rows), key=self.drill_tree)
+
+    def FillTable(self, summary):
+        report, image = summary
+        # clear entire table
+        self.tree.delete(*self.tree.get_children())
+
+        # add data to table
+        if report is not None:
+            for row in report.rows():
+                self.tree.insert('', tk.END, values=row)
+
+        # show the graph
+        if image is not None:
+            self.graph_image = ImageTk.PhotoImage(image)
+            self.lbl_graph.config(image=self.graph_image, text="")
+        else:
+            self.graph_image = None
+            self.lbl_graph.config(image="", text="Install matplotlib to see the graph: pip install matplotlib")
+
+    # Expense or budget changed, refresh now when shown or else when raised
+    def DataChanged(self, user_id, category):
+        session = self.controller.session
+        if session is not None and session.user_id == user_id:
+            self.dirty = True
+            if self.controller.current is self:
+                self.OnShow()
+
+    def OnShow(self):
+        if self.summary is None:
+            return
+        if self.summary[0] is not self.controller.session:
+            # another user logged in, drop the old summary
+            self.summary = None
+            self.tree.delete(*self.tree.get_children())
+            self.drill_tree.delete(*self.drill_tree.get_children())
+            self.graph_image = None
+            self.lbl_graph.config(image="", text="")
+        elif self.dirty:
+            self.DisplaySummary()
+
+    # Add period rows under parent, each one opens to its finer periods or its categories.
+    # parent is gone when the tree was refilled before the rows arrived.
+    def FillPeriod(self, parent, rows):
+        if parent and not self.drill_tree.exists(parent):
+            return
+        for grain, period, total, count in rows or []:
+            iid = self.drill_tree.insert(parent, tk.END, text=period_label(period, grain),
+                values=(Money(total), count))
+            self.drill_periods[iid] = (grain, period)
+            # placeholder so the row can be opened
+            self.drill_tree.insert(iid, tk.END, text="...")
+
+    def FillCategories(self, parent, categories):
+        if not self.drill_tree.exists(parent):
+            return
+        for category, (total, count) in sorted((categories or {}).items()):
+            self.drill_tree.insert(parent, tk.END, text=category, values=(Money(total), count))
+
+    # Load the children of an opened period from the rollup cube
+    def OpenPeriod(self, event):
+        iid = self.drill_tree.focus()
+        if iid not in self.drill_periods or iid in self.drill_opened:
+            return
+        self.drill_opened.add(iid)
+        self.drill_tree.delete(*self.drill_tree.get_children(iid))
+        grain, period = self.drill_periods[iid]
+        session = self.controller.session
+        if grain in ROLLUP_DRILL:
+            self.controller.worker.submit(session.rollup_drill, self.drill_kinds, grain, period,
+                callback=lambda rows: self.FillPeriod(iid, rows))
+        else:
+            self.controller.worker.submit(session.rollup_categories, self.drill_kinds, grain, period,
+                callback=lambda categories: self.FillCategories(iid, categories))
+
+    def ClearText(self):
+        self.ent_strt_dt.delete(0, tk.END)
+        self.ent_end_dt.delete(0, tk.END)
+
 
 
 
@@ -1782,6 +4069,9 @@ class ExpenseView(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         self.lbl_expense = tk.Label(self, text="Expense",
@@ -1851,8 +4141,8 @@ class ExpenseView(Background):
             ipadx=3, ipady=3,
             padx=(5,0))
 
-        self.ent_strt_dt.insert(0, datetime.datetime.now().strftime("%Y-%m-%d")) # initial start date
-        self.ent_end_dt.insert(0, datetime.datetime.now().strftime("%Y-%m-%d")) # initial end date
+        self.ent_strt_dt.insert(0, datetime.datetime.now().strftime(DATE_FORMAT)) # initial start date
+        self.ent_end_dt.insert(0, datetime.datetime.now().strftime(DATE_FORMAT)) # initial end date
 
         # Buttton
         self.btn_submit = tk.Button(self, text="Submit",
@@ -1865,13 +4155,18 @@ class ExpenseView(Background):
 
         # Table
         columns = ('date', 'type', 'amount', 'description')
-        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree = PagedTreeview(self, controller.worker, ledger_row,
+            columns=columns, show="headings")
         self.tree.grid(row=6, column=1, columnspan=5, sticky="nsew")
 
-        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=self.scrollbar.set)
+        self.scrollbar = self.tree.scrollbar
         self.scrollbar.grid(row=6, column=6, sticky="ns")
 
+        # Total of the date range
+        self.lbl_total = tk.Label(self, text="",
+            bg=COLOR_1, fg=COLOR_4, font=FONT_L)
+        self.lbl_total.grid(row=7, column=1, columnspan=5, sticky="e")
+
         self.tree.heading('date', text='Date', anchor=tk.CENTER)
         self.tree.column('date', width=120, minwidth=120,
             anchor=tk.CENTER, stretch=False)
@@ -1888,6 +4183,10 @@ class ExpenseView(Background):
         self.tree.column('description', width=100, minwidth=100,
             anchor=tk.CENTER, stretch=False)
 
+        # Refresh on data changes
+        self.dirty = False
+        controller.Subscribe("expense", self.DataChanged)
+
     def SubmitExpenseView(self):
         # get user input
         input1 = {}
@@ -1899,32 +4198,57 @@ class ExpenseView(Background):
             re.findall("^\d{4}-\d{2}-\d{2}$", input1["start_date"]) and \
             re.findall("^\d{4}-\d{2}-\d{2}$", input1["end_date"]):
 
-            # clear entire table
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-
             # Show expense data
             self.DisplayTable(input1["start_date"], input1["end_date"])
         else:
             messagebox.showwarning("Expense View", "Please enter date as yyyy-mm-dd.")
 
     def DisplayTable(self, strt_dt, end_dt):
-        # get data from budget
-        select_expense = f"""SELECT exp_date, exp_type, exp_amt, exp_description FROM expense
-        WHERE user_id = {input_id}
-        AND DATE(SUBSTR(exp_date, 1, 10)) BETWEEN DATE('{strt_dt}') AND DATE('{end_dt}')
-        ORDER BY exp_date DESC LIMIT 100
-        """
-        expenses = execute_read_query(select_expense)
-
-        # add data to table
-        for exp in expenses:
-            self.tree.insert('', tk.END, values=exp)
+        # get data from expense
+        try:
+            strt_dt, end_dt = date_range_bounds(strt_dt, end_dt)
+        except ValueError:
+            messagebox.showwarning("Expense View", "Please enter date as yyyy-mm-dd.")
+            return None
+        user_id = self.controller.session.user_id
+        self.dirty = False
+        self.tree.Show(functools.partial(expense_page, user_id, strt_dt, end_dt), (user_id, strt_dt, end_dt))
+        self.DisplayTotal(strt_dt, end_dt)
+
+    def DisplayTotal(self, strt_dt, end_dt):
+        # sum the days of [start, end) from the daily totals
+        self.controller.worker.submit(self.controller.session.spend_between,
+            day_number(strt_dt), day_number(end_dt - 1),
+            callback=lambda total: self.lbl_total.config(text=f"Total: {Money(total)}"), key=self.lbl_total)
+
+    # Expense changed, refresh now when shown or else when raised
+    def DataChanged(self, user_id, category):
+        session = self.controller.session
+        if session is not None and session.user_id == user_id:
+            self.dirty = True
+            if self.controller.current is self:
+                self.OnShow()
+
+    def OnShow(self):
+        query = self.tree.query
+        if query is None:
+            return
+        if query[0] != self.controller.session.user_id:
+            # another user logged in, drop the old table
+            self.tree.Show(None, None)
+            self.lbl_total.config(text="")
+        elif self.dirty:
+            self.tree.Refresh()
+            self.DisplayTotal(query[1], query[2])
+        self.dirty = False
 
 class ExpenseAdd(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         self.lbl_expense = tk.Label(self, text="Expense",
@@ -2005,7 +4329,7 @@ class ExpenseAdd(Background):
             ipadx=3, ipady=3,
             padx=(5,0))
 
-        self.ent_date.insert(0, datetime.datetime.now().strftime("%Y-%m-%d")) # initial date
+        self.ent_date.insert(0, datetime.datetime.now().strftime(DATE_FORMAT)) # initial date
 
         # Buttton
         self.btn_submit = tk.Button(self, text="Submit",
@@ -2036,22 +4360,36 @@ class ExpenseAdd(Background):
         # check user input and insert data
         if input1["date"] and input1["type"] and input1["amount"] and \
             re.findall("^\d{4}-\d{2}-\d{2}$", input1["date"]):
-            input1["date"] = input1["date"] + " " + datetime.datetime.now().strftime("%H:%M:%S") # add current time
-            insert_exp = f"""
-            INSERT INTO expense (user_id, exp_date, exp_type, exp_amt, exp_description)
-            VALUES ({input_id}, '{input1["date"]}', '{input1["type"]}', {float(input1["amount"])}, '{input1["description"]}');
-            """
-            execute_query(insert_exp)
-            messagebox.showinfo("Expense Add", "Your expense added.")
+            try:
+                input1["date"] = datetime.datetime.combine(
+                    datetime.datetime.strptime(input1["date"], DATE_FORMAT).date(),
+                    datetime.datetime.now().time()) # add current time
+            except ValueError:
+                messagebox.showwarning("Expense Add", "Please enter date as yyyy-mm-dd, type and amount.")
+                return None
+            try:
+                amount = Money.parse(input1["amount"])
+            except ValueError:
+                messagebox.showwarning("Expense Add", "Please enter amount as a number.")
+                return None
+            self.controller.worker.submit(self.controller.session.add_expense,
+                to_timestamp(input1["date"]), input1["type"], amount, input1["description"],
+                callback=self.AddResult)
         else:
             messagebox.showwarning("Expense Add", "Please enter date as yyyy-mm-dd, type and amount.")
 
+    def AddResult(self, cursor):
+        if cursor is not None:
+            messagebox.showinfo("Expense Add", "Your expense added.")
+        else:
+            messagebox.showwarning("Expense Add", "Your expense could not be saved.")
+
     def ClearText(self):
         self.ent_date.delete(0, tk.END)
         self.ent_type.delete(0, tk.END)
         self.ent_amount.delete(0, tk.END)
         self.ent_description.delete(0, tk.END)
-        self.ent_date.insert(0, datetime.datetime.now().strftime("%Y-%m-%d"))
+        self.ent_date.insert(0, datetime.datetime.now().strftime(DATE_FORMAT))
 
 class ExpenseUpdate(Background):
     def __init__(self, parent, controller):
@@ -2242,10 +4580,50 @@ class ExpenseDelete(Background):
 
 
 
+# Function to read the subscription rule typed in page, None after a warning.
+# The rule is (type, amount, interval, anchor, end, description), end is exclusive or None.
+def read_subscription(title, page):
+    input1 = {}
+    input1["date"] = page.ent_date.get()
+    input1["type"] = page.ent_type.get()
+    input1["amount"] = page.ent_amount.get()
+    input1["description"] = page.ent_description.get()
+    input1["every"] = page.var_every.get()
+    input1["end"] = page.ent_end.get()
+
+    # check user input
+    if not (input1["date"] and input1["type"] and input1["amount"] and \
+        re.findall("^\d{4}-\d{2}-\d{2}$", input1["date"])):
+        messagebox.showwarning(title, "Please enter date as yyyy-mm-dd, type and amount.")
+        return None
+    if input1["end"] and not re.findall("^\d{4}-\d{2}-\d{2}$", input1["end"]):
+        messagebox.showwarning(title, "Please enter end date as yyyy-mm-dd or leave it empty.")
+        return None
+    try:
+        anchor = parse_date(input1["date"])
+        # the end date is the last day a charge can fall on
+        sub_end = date_range_bounds(input1["end"], input1["end"])[1] if input1["end"] else None
+    except ValueError:
+        messagebox.showwarning(title, "Please enter date as yyyy-mm-dd, type and amount.")
+        return None
+    if sub_end is not None and sub_end <= anchor:
+        messagebox.showwarning(title, "Please enter an end date after the date.")
+        return None
+    try:
+        amount = Money.parse(input1["amount"])
+    except ValueError:
+        messagebox.showwarning(title, "Please enter amount as a number.")
+        return None
+    return (input1["type"], amount, SUBSCRIPTION_INTERVALS[input1["every"]],
+        anchor, sub_end, input1["description"])
+
 class SubscriptionView(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         lbl_subscription = tk.Label(self, text="Subscription",
@@ -2293,43 +4671,143 @@ class SubscriptionView(Background):
 
         ############ Content############
         # Label
-        lbl_date = tk.Label(self, text="Date",
+        self.lbl_date = tk.Label(self, text="Date",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
-        lbl_tide = tk.Label(self, text="~",
+        self.lbl_tide = tk.Label(self, text="~",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
 
-        lbl_date.grid(row=2, column=1)
-        lbl_tide.grid(row=2, column=3,
+        self.lbl_date.grid(row=2, column=1)
+        self.lbl_tide.grid(row=2, column=3,
             padx=(5,0))
 
         # Entry
-        ent_strt_dt = tk.Entry(self, font=FONT_M,
+        self.ent_strt_dt = tk.Entry(self, font=FONT_M,
             width=12)
-        ent_end_dt = tk.Entry(self, font=FONT_M,
+        self.ent_end_dt = tk.Entry(self, font=FONT_M,
             width=12)
 
-        ent_strt_dt.grid(row=2, column=2,
+        self.ent_strt_dt.grid(row=2, column=2,
             ipadx=3, ipady=3,
             padx=(5,0))
-        ent_end_dt.grid(row=2, column=4,
+        self.ent_end_dt.grid(row=2, column=4,
             ipadx=3, ipady=3,
             padx=(5,0))
 
+        strt_dt, end_dt = subscription_window()
+        self.ent_strt_dt.insert(0, format_timestamp(strt_dt, DATE_FORMAT)) # initial start date: today
+        self.ent_end_dt.insert(0, format_timestamp(end_dt - 1, DATE_FORMAT)) # initial end date: in 12 months
+
         # Buttton
-        btn_submit = tk.Button(self, text="Submit",
+        self.btn_submit = tk.Button(self, text="Submit",
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
-        btn_submit.grid(row=2, column=5,
+            command=lambda:self.SubmitSubscriptionView())
+        self.btn_submit.grid(row=2, column=5,
             padx=(5,0))
 
-        # Table: TreeView
+        # Table: charges of the date range, expanded from the subscription rules
+        columns = ('date', 'id', 'type', 'amount', 'description')
+        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree.grid(row=6, column=1, columnspan=5, sticky="nsew")
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.grid(row=6, column=6, sticky="ns")
+
+        # Total of the date range
+        self.lbl_total = tk.Label(self, text="",
+            bg=COLOR_1, fg=COLOR_4, font=FONT_L)
+        self.lbl_total.grid(row=7, column=1, columnspan=5, sticky="e")
+
+        self.tree.heading('date', text='Date', anchor=tk.CENTER)
+        self.tree.column('date', width=120, minwidth=120,
+            anchor=tk.CENTER, stretch=False)
+
+        self.tree.heading('id', text='ID', anchor=tk.CENTER)
+        self.tree.column('id', width=50, minwidth=50,
+            anchor=tk.CENTER, stretch=False)
+
+        self.tree.heading('type', text='Type', anchor=tk.CENTER)
+        self.tree.column('type', width=100, minwidth=100,
+            anchor=tk.CENTER, stretch=False)
+
+        self.tree.heading('amount', text='Amount', anchor=tk.CENTER)
+        self.tree.column('amount', width=100, minwidth=100,
+            anchor=tk.CENTER, stretch=False)
+
+        self.tree.heading('description', text='Description', anchor=tk.CENTER)
+        self.tree.column('description', width=100, minwidth=100,
+            anchor=tk.CENTER, stretch=False)
+
+        # Refresh on data changes, query is (user_id, start, end) of the table shown
+        self.query = None
+        self.dirty = False
+        controller.Subscribe("subscription", self.DataChanged)
+
+    def SubmitSubscriptionView(self):
+        # get user input
+        input1 = {}
+        input1["start_date"] = self.ent_strt_dt.get()
+        input1["end_date"] = self.ent_end_dt.get()
+
+        # check user input
+        if input1["start_date"] and input1["end_date"] and \
+            re.findall("^\d{4}-\d{2}-\d{2}$", input1["start_date"]) and \
+            re.findall("^\d{4}-\d{2}-\d{2}$", input1["end_date"]):
+
+            # Show subscription charges
+            self.DisplayTable(input1["start_date"], input1["end_date"])
+        else:
+            messagebox.showwarning("Subscription View", "Please enter date as yyyy-mm-dd.")
+
+    def DisplayTable(self, strt_dt, end_dt):
+        try:
+            strt_dt, end_dt = date_range_bounds(strt_dt, end_dt)
+        except ValueError:
+            messagebox.showwarning("Subscription View", "Please enter date as yyyy-mm-dd.")
+            return None
+        self.ShowCharges(strt_dt, end_dt)
+
+    def ShowCharges(self, strt_dt, end_dt):
+        # expand the rules into charges off the Tk thread
+        self.query = (self.controller.session.user_id, strt_dt, end_dt)
+        self.dirty = False
+        self.controller.worker.submit(self.controller.session.upcoming_charges, strt_dt, end_dt,
+            callback=self.FillTable, key=self.tree)
+
+    def FillTable(self, charges):
+        rows, total = charges
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert('', tk.END, values=subscription_row(row))
+        text = f"Total: {Money(total)}"
+        if len(rows) >= SUBSCRIPTION_VIEW_ROWS:
+            text = f"First {len(rows)} charges shown, " + text
+        self.lbl_total.config(text=text)
+
+    # Subscription changed, refresh now when shown or else when raised
+    def DataChanged(self, user_id, category):
+        session = self.controller.session
+        if session is not None and session.user_id == user_id:
+            self.dirty = True
+            if self.controller.current is self:
+                self.OnShow()
+
+    def OnShow(self):
+        if self.query is None or self.query[0] != self.controller.session.user_id:
+            # first shown or another user logged in, show the entered range
+            self.DisplayTable(self.ent_strt_dt.get(), self.ent_end_dt.get())
+        elif self.dirty:
+            self.ShowCharges(self.query[1], self.query[2])
 
 class SubscriptionAdd(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         lbl_subscription = tk.Label(self, text="Subscription",
@@ -2377,60 +4855,107 @@ class SubscriptionAdd(Background):
 
         ############ Content############
         # Label
-        lbl_date = tk.Label(self, text="Date",
+        self.lbl_date = tk.Label(self, text="Date",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
-        lbl_type = tk.Label(self, text="Type",
+        self.lbl_type = tk.Label(self, text="Type",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
-        lbl_amount = tk.Label(self, text="Amount",
+        self.lbl_amount = tk.Label(self, text="Amount",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
-        lbl_description = tk.Label(self, text="Description",
+        self.lbl_description = tk.Label(self, text="Description",
+            bg=COLOR_1, fg=COLOR_4, font=FONT_L)
+        self.lbl_every = tk.Label(self, text="Every",
+            bg=COLOR_1, fg=COLOR_4, font=FONT_L)
+        self.lbl_end = tk.Label(self, text="End date",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
 
-        lbl_date.grid(row=2, column=1, sticky="e")
-        lbl_type.grid(row=3, column=1, sticky="e")
-        lbl_amount.grid(row=4, column=1, sticky="e")
-        lbl_description.grid(row=5, column=1, sticky="e")
+        self.lbl_date.grid(row=2, column=1, sticky="e")
+        self.lbl_type.grid(row=3, column=1, sticky="e")
+        self.lbl_amount.grid(row=4, column=1, sticky="e")
+        self.lbl_description.grid(row=5, column=1, sticky="e")
+        self.lbl_every.grid(row=6, column=1, sticky="e")
+        self.lbl_end.grid(row=7, column=1, sticky="e")
 
         # Entry
-        ent_date = tk.Entry(self, font=FONT_M)
-        ent_type = tk.Entry(self, font=FONT_M)
-        ent_amount = tk.Entry(self, font=FONT_M)
-        ent_description = tk.Entry(self, font=FONT_M)
+        self.ent_date = tk.Entry(self, font=FONT_M)
+        self.ent_type = tk.Entry(self, font=FONT_M)
+        self.ent_amount = tk.Entry(self, font=FONT_M)
+        self.ent_description = tk.Entry(self, font=FONT_M)
+        self.ent_end = tk.Entry(self, font=FONT_M)
 
-        ent_date.grid(row=2, column=2, columnspan=2,
+        self.ent_date.grid(row=2, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
-        ent_type.grid(row=3, column=2, columnspan=2,
+        self.ent_type.grid(row=3, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
-        ent_amount.grid(row=4, column=2, columnspan=2,
+        self.ent_amount.grid(row=4, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
-        ent_description.grid(row=5, column=2, columnspan=2,
+        self.ent_description.grid(row=5, column=2, columnspan=2,
+            ipadx=3, ipady=3,
+            padx=(5,0))
+        self.ent_end.grid(row=7, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
 
+        # Optionmenu
+        OPTIONS = list(SUBSCRIPTION_INTERVALS)
+        self.var_every = tk.StringVar()
+        self.var_every.set("Monthly")
+
+        opt_every = tk.OptionMenu(self, self.var_every, *OPTIONS)
+        opt_every.config(bg=COLOR_3, fg=COLOR_1, font=FONT_M)
+        opt_every.grid(row=6, column=2, sticky="w",
+            padx=(5,0))
+
+        self.ent_date.insert(0, datetime.datetime.now().strftime(DATE_FORMAT)) # initial date
+
         # Buttton
-        btn_submit = tk.Button(self, text="Submit",
+        self.btn_submit = tk.Button(self, text="Submit",
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
-        btn_cancel = tk.Button(self, text="Cancel",
+            command=lambda:self.SubmitSubscriptionAdd())
+        self.btn_cancel = tk.Button(self, text="Cancel",
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
+            command=lambda:self.ClearText())
 
-        btn_submit.grid(row=6, column=2,
+        self.btn_submit.grid(row=8, column=2,
             pady=(5,0))
-        btn_cancel.grid(row=6, column=3,
+        self.btn_cancel.grid(row=8, column=3,
             pady=(5,0))
 
+    def SubmitSubscriptionAdd(self):
+        # get user input
+        rule = read_subscription("Subscription Add", self)
+        if rule is not None:
+            self.controller.worker.submit(self.controller.session.add_subscription, *rule,
+                callback=self.AddResult)
+
+    def AddResult(self, cursor):
+        if cursor is not None:
+            messagebox.showinfo("Subscription Add", "Your subscription added.")
+        else:
+            messagebox.showwarning("Subscription Add", "Your subscription could not be saved.")
+
+    def ClearText(self):
+        self.ent_date.delete(0, tk.END)
+        self.ent_type.delete(0, tk.END)
+        self.ent_amount.delete(0, tk.END)
+        self.ent_description.delete(0, tk.END)
+        self.ent_end.delete(0, tk.END)
+        self.var_every.set("Monthly")
+        self.ent_date.insert(0, datetime.datetime.now().strftime(DATE_FORMAT))
+
 class SubscriptionUpdate(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         lbl_subscription = tk.Label(self, text="Subscription",
@@ -2478,67 +5003,121 @@ class SubscriptionUpdate(Background):
 
         ############ Content############
         # Label
-        lbl_id = tk.Label(self, text="ID",
+        self.lbl_id = tk.Label(self, text="ID",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
-        lbl_date = tk.Label(self, text="Date",
+        self.lbl_date = tk.Label(self, text="Date",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
-        lbl_type = tk.Label(self, text="Type",
+        self.lbl_type = tk.Label(self, text="Type",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
-        lbl_amount = tk.Label(self, text="Amount",
+        self.lbl_amount = tk.Label(self, text="Amount",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
-        lbl_description = tk.Label(self, text="Description",
+        self.lbl_description = tk.Label(self, text="Description",
+            bg=COLOR_1, fg=COLOR_4, font=FONT_L)
+        self.lbl_every = tk.Label(self, text="Every",
+            bg=COLOR_1, fg=COLOR_4, font=FONT_L)
+        self.lbl_end = tk.Label(self, text="End date",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
 
-        lbl_id.grid(row=2, column=1, sticky="e")
-        lbl_date.grid(row=3, column=1, sticky="e")
-        lbl_type.grid(row=4, column=1, sticky="e")
-        lbl_amount.grid(row=5, column=1, sticky="e")
-        lbl_description.grid(row=6, column=1, sticky="e")
+        self.lbl_id.grid(row=2, column=1, sticky="e")
+        self.lbl_date.grid(row=3, column=1, sticky="e")
+        self.lbl_type.grid(row=4, column=1, sticky="e")
+        self.lbl_amount.grid(row=5, column=1, sticky="e")
+        self.lbl_description.grid(row=6, column=1, sticky="e")
+        self.lbl_every.grid(row=7, column=1, sticky="e")
+        self.lbl_end.grid(row=8, column=1, sticky="e")
 
         # Entry
-        ent_id = tk.Entry(self, font=FONT_M)
-        ent_date = tk.Entry(self, font=FONT_M)
-        ent_type = tk.Entry(self, font=FONT_M)
-        ent_amount = tk.Entry(self, font=FONT_M)
-        ent_description = tk.Entry(self, font=FONT_M)
+        self.ent_id = tk.Entry(self, font=FONT_M)
+        self.ent_date = tk.Entry(self, font=FONT_M)
+        self.ent_type = tk.Entry(self, font=FONT_M)
+        self.ent_amount = tk.Entry(self, font=FONT_M)
+        self.ent_description = tk.Entry(self, font=FONT_M)
+        self.ent_end = tk.Entry(self, font=FONT_M)
 
-        ent_id.grid(row=2, column=2, columnspan=2,
+        self.ent_id.grid(row=2, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
-        ent_date.grid(row=3, column=2, columnspan=2,
+        self.ent_date.grid(row=3, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
-        ent_type.grid(row=4, column=2, columnspan=2,
+        self.ent_type.grid(row=4, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
-        ent_amount.grid(row=5, column=2, columnspan=2,
+        self.ent_amount.grid(row=5, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
-        ent_description.grid(row=6, column=2, columnspan=2,
+        self.ent_description.grid(row=6, column=2, columnspan=2,
+            ipadx=3, ipady=3,
+            padx=(5,0))
+        self.ent_end.grid(row=8, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
 
+        # Optionmenu
+        OPTIONS = list(SUBSCRIPTION_INTERVALS)
+        self.var_every = tk.StringVar()
+        self.var_every.set("Monthly")
+
+        opt_every = tk.OptionMenu(self, self.var_every, *OPTIONS)
+        opt_every.config(bg=COLOR_3, fg=COLOR_1, font=FONT_M)
+        opt_every.grid(row=7, column=2, sticky="w",
+            padx=(5,0))
+
+        self.ent_date.insert(0, datetime.datetime.now().strftime(DATE_FORMAT)) # initial date
+
         # Buttton
-        btn_submit = tk.Button(self, text="Submit",
+        self.btn_submit = tk.Button(self, text="Submit",
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
-        btn_cancel = tk.Button(self, text="Cancel",
+            command=lambda:self.SubmitSubscriptionUpdate())
+        self.btn_cancel = tk.Button(self, text="Cancel",
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
+            command=lambda:self.ClearText())
 
-        btn_submit.grid(row=7, column=2,
+        self.btn_submit.grid(row=9, column=2,
             pady=(5,0))
-        btn_cancel.grid(row=7, column=3,
+        self.btn_cancel.grid(row=9, column=3,
             pady=(5,0))
 
+    def SubmitSubscriptionUpdate(self):
+        # get user input
+        sub_id = self.ent_id.get()
+        if not re.findall("^\d+$", sub_id):
+            messagebox.showwarning("Subscription Update", "Please enter the ID of the subscription.")
+            return None
+        rule = read_subscription("Subscription Update", self)
+        if rule is not None:
+            self.controller.worker.submit(self.controller.session.update_subscription, int(sub_id), *rule,
+                callback=self.UpdateResult)
+
+    def UpdateResult(self, cursor):
+        if cursor is None:
+            messagebox.showwarning("Subscription Update", "Your subscription could not be saved.")
+        elif cursor.rowcount:
+            messagebox.showinfo("Subscription Update", "Your subscription updated.")
+        else:
+            messagebox.showwarning("Subscription Update", "There is no subscription with this ID.")
+
+    def ClearText(self):
+        self.ent_id.delete(0, tk.END)
+        self.ent_date.delete(0, tk.END)
+        self.ent_type.delete(0, tk.END)
+        self.ent_amount.delete(0, tk.END)
+        self.ent_description.delete(0, tk.END)
+        self.ent_end.delete(0, tk.END)
+        self.var_every.set("Monthly")
+        self.ent_date.insert(0, datetime.datetime.now().strftime(DATE_FORMAT))
+
 class SubscriptionDelete(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         ############ Left nav ############
         # Label
         lbl_subscription = tk.Label(self, text="Subscription",
@@ -2586,34 +5165,55 @@ class SubscriptionDelete(Background):
 
         ############ Content############
         # Label
-        lbl_id = tk.Label(self, text="ID",
+        self.lbl_id = tk.Label(self, text="ID",
             bg=COLOR_1, fg=COLOR_4, font=FONT_L)
-        lbl_id.grid(row=2, column=1, sticky="e")
+
+        self.lbl_id.grid(row=2, column=1, sticky="e")
 
         # Entry
-        ent_id = tk.Entry(self, font=FONT_M)
+        self.ent_id = tk.Entry(self, font=FONT_M)
 
-        ent_id.grid(row=2, column=2, columnspan=2,
+        self.ent_id.grid(row=2, column=2, columnspan=2,
             ipadx=3, ipady=3,
             padx=(5,0))
 
         # Buttton
-        btn_submit = tk.Button(self, text="Submit",
+        self.btn_submit = tk.Button(self, text="Submit",
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
-        btn_cancel = tk.Button(self, text="Cancel",
+            command=lambda:self.SubmitSubscriptionDelete())
+        self.btn_cancel = tk.Button(self, text="Cancel",
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
+            command=lambda:self.ClearText())
 
-        btn_submit.grid(row=3, column=2,
+        self.btn_submit.grid(row=3, column=2,
             pady=(5,0))
-        btn_cancel.grid(row=3, column=3,
+        self.btn_cancel.grid(row=3, column=3,
             pady=(5,0))
 
+    def SubmitSubscriptionDelete(self):
+        # get user input
+        sub_id = self.ent_id.get()
+        if re.findall("^\d+$", sub_id):
+            self.controller.worker.submit(self.controller.session.delete_subscription, int(sub_id),
+                callback=self.DeleteResult)
+        else:
+            messagebox.showwarning("Subscription Delete", "Please enter the ID of the subscription.")
+
+    def DeleteResult(self, cursor):
+        if cursor is None:
+            messagebox.showwarning("Subscription Delete", "Your subscription could not be deleted.")
+        elif cursor.rowcount:
+            messagebox.showinfo("Subscription Delete", "Your subscription deleted.")
+        else:
+            messagebox.showwarning("Subscription Delete", "There is no subscription with this ID.")
+
+    def ClearText(self):
+        self.ent_id.delete(0, tk.END)
+
 
 
 class Tax(Background):
@@ -3748,6 +6348,9 @@ class Export(Background):
     def __init__(self, parent, controller):
         super().__init__(self, parent)
 
+        # to call another class function
+        self.controller = controller
+
         # Label
         lbl_export = tk.Label(self, text="Export",
             bg=COLOR_1, fg=COLOR_3, font=FONT_HEAD)
@@ -3764,13 +6367,13 @@ class Export(Background):
             padx=(5,0))
 
         # Entry
-        ent_strt_dt =tk.Entry(self, font=FONT_M)
-        ent_end_dt =tk.Entry(self, font=FONT_M)
+        self.ent_strt_dt =tk.Entry(self, font=FONT_M)
+        self.ent_end_dt =tk.Entry(self, font=FONT_M)
 
-        ent_strt_dt.grid(row=2, column=2,
+        self.ent_strt_dt.grid(row=2, column=2,
             ipadx=3, ipady=3,
             padx=(5,0))
-        ent_end_dt.grid(row=2, column=4,
+        self.ent_end_dt.grid(row=2, column=4,
             ipadx=3, ipady=3,
             padx=(5,0))
 
@@ -3779,12 +6382,12 @@ class Export(Background):
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
+            command=lambda:self.SubmitExport())
         btn_cancel = tk.Button(self, text="Cancel",
             font=FONT_M, relief="ridge",
             bg=COLOR_4, fg=COLOR_1,
             width=7,
-            command="#")
+            command=lambda:self.ClearText())
         btn_back = tk.Button(self, text="<< Menu",
             font=FONT_M, relief="ridge",
             activebackground=COLOR_4, activeforeground=COLOR_1,
@@ -3797,25 +6400,26 @@ class Export(Background):
             padx=(15,0), pady=(15,0))
 
         # Radiobutton
-        var_radio = tk.IntVar()
+        self.var_radio = tk.IntVar()
+        self.var_radio.set(1)
 
         rad_expense = tk.Radiobutton(self, text="Expense", justify="left",
-                                    variable=var_radio, value=1,
+                                    variable=self.var_radio, value=1,
                                     bg=COLOR_3, fg=COLOR_1, font=FONT_M)
-        rad_subscription = tk.Radiobutton(self, text="Income", justify="left",
-                                    variable=var_radio, value=2,
+        rad_subscription = tk.Radiobutton(self, text="Subscription", justify="left",
+                                    variable=self.var_radio, value=2,
                                     bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         rad_income = tk.Radiobutton(self, text="Income", justify="left",
-                                    variable=var_radio, value=3,
+                                    variable=self.var_radio, value=3,
                                     bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         rad_saving = tk.Radiobutton(self, text="Saving", justify="left",
-                                    variable=var_radio, value=4,
+                                    variable=self.var_radio, value=4,
                                     bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         rad_invest = tk.Radiobutton(self, text="Invest", justify="left",
-                                    variable=var_radio, value=5,
+                                    variable=self.var_radio, value=5,
                                     bg=COLOR_3, fg=COLOR_1, font=FONT_M)
         rad_budget = tk.Radiobutton(self, text="Budget", justify="left",
-                                    variable=var_radio, value=6,
+                                    variable=self.var_radio, value=6,
                                     bg=COLOR_3, fg=COLOR_1, font=FONT_M)
 
         rad_expense.grid(row=2, column=0, sticky="w",
@@ -3831,8 +6435,129 @@ class Export(Background):
         rad_budget.grid(row=7, column=0, sticky="w",
             padx=(30,0), pady=(5,0))
 
+    def SubmitExport(self):
+        # get user input
+        input1 = {}
+        input1["start_date"] = self.ent_strt_dt.get()
+        input1["end_date"] = self.ent_end_dt.get()
+
+        # check user input
+        try:
+            strt_dt, end_dt = date_range_bounds(input1["start_date"], input1["end_date"])
+        except ValueError:
+            messagebox.showwarning("Export", "Please enter date as yyyy-mm-dd.")
+            return None
+        kinds = {1: TOTALS_EXPENSE,
+            2: TOTALS_BUDGET + BUDGET_SUBSCRIPTION,
+            3: TOTALS_BUDGET + BUDGET_INCOME,
+            4: TOTALS_BUDGET + BUDGET_SAVING,
+            5: TOTALS_BUDGET + BUDGET_INVEST,
+            6: TOTALS_BUDGET + BUDGET_EXPENSE}
+        kind = kinds[self.var_radio.get()]
+
+        path = filedialog.asksaveasfilename(title="Export", defaultextension=".csv",
+            initialfile=f"{kind}_{input1['start_date']}_{input1['end_date']}.csv",
+            filetypes=[("CSV file", "*.csv")])
+        if not path:
+            return None
+
+        # totals per period come from the rollup cube on the database worker
+        self.controller.worker.submit(self.controller.session.rollup_rows, [kind], strt_dt, end_dt,
+            callback=lambda rows: self.WriteFile(path, kind, rows), key=self)
+
+    def WriteFile(self, path, kind, rows):
+        try:
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(["kind", "grain", "period", "category", "total", "count"])
+                for grain, period, category, total, count in rows or []:
+                    writer.writerow([kind, grain, period_label(period, grain), category, Money(total), count])
+        except OSError as e:
+            messagebox.showwarning("Export", f"The file could not be saved: {e}")
+            return None
+        messagebox.showinfo("Export", f"{len(rows or [])} rows exported.")
+
+    def ClearText(self):
+        self.ent_strt_dt.delete(0, tk.END)
+        self.ent_end_dt.delete(0, tk.END)
+
+
+
+# All pages of the app
+PAGES = [Login, Register, Menu,
+        BudgetExp, BudgetSub, BudgetInc, BudgetSav, BudgetInv,
+        Summary,
+        ExpenseView, ExpenseAdd, ExpenseUpdate, ExpenseDelete,
+        SubscriptionView, SubscriptionAdd, SubscriptionUpdate, SubscriptionDelete,
+        IncomeView, IncomeAdd, IncomeUpdate, IncomeDelete,
+        SavingView, SavingAdd, SavingUpdate, SavingDelete,
+        InvestView, InvestAdd, InvestUpdate, InvestDelete,
+        Export]
+
+# Pages likely to be opened next from a page, built ahead while idle
+PREFETCH_PAGES = {
+    Login: [Menu, Register],
+    Menu: [BudgetExp, ExpenseView, ExpenseAdd, Summary],
+}
+
 
 
 if __name__ == '__main__':
-    root = MoneyApp()
-    root.mainloop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Money Management System")
+    parser.add_argument("--check-index", action="store_true",
+        help="show the plan of the expense view query and check it uses its index")
+    parser.add_argument("--slow-query-ms", type=float, default=SLOW_QUERY_MS,
+        help=f"log statements slower than this to {SLOW_QUERY_LOG}")
+    parser.add_argument("--stats-file",
+        help="write the query stats as JSON to this file on exit")
+    parser.add_argument("--password-iterations", type=int, default=PASSWORD_ITERATIONS,
+        help="PBKDF2 iterations for new and upgraded password hashes")
+    parser.add_argument("--profile-startup", action="store_true",
+        help="build the window, print time to first frame and peak memory, then exit")
+    parser.add_argument("--rebuild-totals", action="store_true",
+        help="recompute the monthly totals from the expense and budget tables")
+    parser.add_argument("--eager-pages", action="store_true",
+        help="build every page at startup instead of when first shown")
+    parser.add_argument("--benchmark-summary", type=int, nargs="?", const=SUMMARY_BENCHMARK_ROWS,
+        metavar="ROWS", help="time the budget against actual summary over ROWS random expenses")
+    parser.add_argument("--benchmark-kdf", type=float, nargs="?", const=PASSWORD_TARGET_MS,
+        metavar="TARGET_MS", help="find the password iterations that take TARGET_MS on this machine")
+    args = parser.parse_args()
+    db.slow_query_ms = args.slow_query_ms
+    open_error_log()
+    PASSWORD_ITERATIONS = args.password_iterations
+
+    if args.benchmark_summary is not None:
+        elapsed = benchmark_budget_report(args.benchmark_summary)
+        if elapsed is None:
+            sys.exit("The summary needs NumPy, install it with: pip install numpy")
+        print(f"Summary of {args.benchmark_summary} rows took {elapsed * 1000:.0f} ms")
+        sys.exit(0)
+    if args.benchmark_kdf is not None:
+        iterations = calibrate_password_iterations(args.benchmark_kdf)
+        print(f"Use --password-iterations {iterations} for about {args.benchmark_kdf:.0f} ms per login")
+        sys.exit(0)
+    migrate()
+
+    if args.check_index:
+        sys.exit(0 if check_expense_index() else 1)
+    if args.rebuild_totals:
+        rebuild_monthly_totals()
+        print("Monthly totals rebuilt")
+        sys.exit(0)
+
+    started = time.perf_counter()
+    root = MoneyApp(eager_pages=args.eager_pages)
+    if args.profile_startup:
+        root.update()
+        print(f"Time to first frame: {(time.perf_counter() - started) * 1000:.0f} ms"
+            f" ({len(root.frames)} of {len(PAGES)} pages built)")
+        memory = peak_memory_mb()
+        if memory is not None:
+            print(f"Peak resident memory: {memory:.1f} MB")
+        root.destroy()
+        sys.exit(0)
+    root.mainloop()
+
+    if args.stats_file:
+        db.dump_stats(args.stats_file)
\ No newline at end of file
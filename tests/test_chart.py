@@ -0,0 +1,50 @@
+import datetime
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+@unittest.skipIf(main.load_numpy() is None or main.load_matplotlib() is None,
+    "NumPy and matplotlib are not installed")
+class BudgetChartTest(unittest.TestCase):
+    # monthly report of 2024 from {month: (budget, actual)} in minor units
+    def report(self, months):
+        np = main.load_numpy()
+        dates = [main.to_timestamp(datetime.datetime(2024, month, 15)) for month in months]
+        def ledger(index):
+            return main.Ledger(np.zeros(len(months), dtype=np.int64),
+                np.array([amounts[index] for amounts in months.values()], dtype=np.int64),
+                main.day_numbers(np, np.array(dates, dtype=np.int64)))
+        return main.BudgetReport(np, ledger(0), ledger(1), ["food"], "month")
+
+    def pixels(self, *reports):
+        chart = main.BudgetChart(main.load_matplotlib())
+        for report in reports:
+            chart.update(report)
+        return bytes(chart.canvas.buffer_rgba())
+
+    def assert_same_as_fresh(self, before, after):
+        self.assertEqual(self.pixels(before, after), self.pixels(after))
+
+    def test_partial_update_draws_like_a_fresh_render(self):
+        before = self.report({1: (50000, 40000), 2: (30000, 20000), 3: (10000, 60000)})
+        after = self.report({1: (50000, 40000), 2: (30000, 35000), 3: (10000, 60000)})
+        self.assert_same_as_fresh(before, after)
+
+    def test_partial_update_of_every_bar(self):
+        before = self.report({1: (50000, 40000), 2: (30000, 20000), 3: (10000, 60000)})
+        after = self.report({1: (45000, 41000), 2: (29000, 35000), 3: (12000, 60000)})
+        self.assert_same_as_fresh(before, after)
+
+    def test_new_period_redraws(self):
+        before = self.report({1: (50000, 40000), 2: (30000, 20000)})
+        after = self.report({1: (50000, 40000), 2: (30000, 20000), 3: (10000, 60000)})
+        self.assert_same_as_fresh(before, after)
+
+
+if __name__ == "__main__":
+    unittest.main()
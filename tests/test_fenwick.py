@@ -0,0 +1,60 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+class FenwickTreeTest(unittest.TestCase):
+    def assert_sums(self, tree, totals, first_day, last_day):
+        for first in range(first_day, last_day + 1):
+            for last in range(first - 1, last_day + 1):
+                expected = sum(total for day, total in totals.items() if first <= day <= last)
+                self.assertEqual(tree.range_sum(first, last), expected, (first, last))
+
+    def test_range_sum_after_point_updates(self):
+        random.seed(3)
+        totals = {day: random.randint(-500, 5000) for day in range(100, 140, 3)}
+        tree = main.FenwickTree.from_totals(totals)
+        for _ in range(50):
+            day = random.randint(100, 139)
+            amount = random.randint(-1000, 1000)
+            tree.add(day, amount)
+            totals[day] = totals.get(day, 0) + amount
+        self.assert_sums(tree, totals, 95, 145)
+
+    def test_range_sum_after_growth(self):
+        tree = main.FenwickTree.from_totals({100: 5, 101: 7})
+        totals = {100: 5, 101: 7}
+        for day, amount in ((102, 1), (130, 11), (60, 13), (59, 17), (400, 19)):
+            tree.add(day, amount)
+            totals[day] = totals.get(day, 0) + amount
+        self.assertLessEqual(tree.first_day, 59)
+        self.assert_sums(tree, totals, 50, 140)
+        self.assertEqual(tree.range_sum(0, 1000), sum(totals.values()))
+        self.assertEqual(tree.range_sum(400, 400), 19)
+
+    def test_boundaries(self):
+        tree = main.FenwickTree.from_totals({10: 1, 14: 2, 20: 4})
+        self.assertEqual(tree.range_sum(10, 10), 1)
+        self.assertEqual(tree.range_sum(20, 20), 4)
+        self.assertEqual(tree.range_sum(10, 20), 7)
+        # empty ranges and ranges outside the tree
+        self.assertEqual(tree.range_sum(15, 14), 0)
+        self.assertEqual(tree.range_sum(0, 9), 0)
+        self.assertEqual(tree.range_sum(21, 100), 0)
+        self.assertEqual(tree.range_sum(-100, 100), 7)
+
+    def test_empty_tree(self):
+        tree = main.FenwickTree.from_totals({})
+        self.assertEqual(tree.range_sum(0, 100), 0)
+        tree.add(5000, 3)
+        self.assertEqual(tree.range_sum(5000, 5000), 3)
+        self.assertEqual(tree.range_sum(0, 4999), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+# Fail the chunked copy into target, as if the app was closed during the migration
+def interrupt_copy(target):
+    run = main.CopyRows.run
+    def interrupted(self, manager):
+        if self.target == target:
+            raise KeyboardInterrupt("interrupted")
+        return run(self, manager)
+    return mock.patch.object(main.CopyRows, "run", interrupted)
+
+
+# Connection manager that fails its transaction after the given number of them
+class FailingManager(main.ConnectionManager):
+    transactions = None
+
+    @contextmanager
+    def transaction(self):
+        if self.transactions is not None:
+            if self.transactions == 0:
+                raise KeyboardInterrupt("interrupted")
+            self.transactions -= 1
+        with super().transaction() as connection:
+            yield connection
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.directory.name, "database"))
+        self.manager = FailingManager(self.directory.name)
+        self.connection = self.manager.get_connection()
+
+    def tearDown(self):
+        self.manager.close()
+        self.directory.cleanup()
+
+    def version(self):
+        return self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+    # a database of version 3: one budget line per row, REAL amounts and text dates
+    def legacy_database(self):
+        main.migrate(self.manager, main.MIGRATIONS[:3])
+        with self.manager.transaction() as connection:
+            connection.execute("INSERT INTO users (user_id, username, password) VALUES (1, 'user', 'x')")
+            connection.execute("""INSERT INTO budget (user_id, category_kind, bg_label, bg_amt, bg_date, bg_description)
+                VALUES (1, 'exp', 'food', 12.5, '2024-01-02 10:00:00', '')""")
+            connection.execute("""INSERT INTO expense (exp_date, exp_type, exp_amt, exp_description, user_id)
+                VALUES ('2024-01-03 11:30:00', 'food', 3.25, '', 1)""")
+
+    def rows(self):
+        budget = self.connection.execute("SELECT bg_amt, bg_date FROM budget").fetchall()
+        expense = self.connection.execute("SELECT exp_amt, exp_date FROM expense").fetchall()
+        return budget, expense
+
+    def test_resume_interrupted_minor_units(self):
+        self.legacy_database()
+        with interrupt_copy("expense_new"):
+            with self.assertRaises(KeyboardInterrupt):
+                main.migrate(self.manager, main.MIGRATIONS[:4])
+        self.assertEqual(self.version(), 3)
+
+        main.migrate(self.manager, main.MIGRATIONS[:4])
+        self.assertEqual(self.version(), 4)
+        self.assertEqual(self.rows(), ([(1250, "2024-01-02 10:00:00")], [(325, "2024-01-03 11:30:00")]))
+
+    def test_resume_interrupted_epoch_dates(self):
+        self.legacy_database()
+        main.migrate(self.manager, main.MIGRATIONS[:4])
+        with interrupt_copy("expense_new"):
+            with self.assertRaises(KeyboardInterrupt):
+                main.migrate(self.manager, main.MIGRATIONS[:5])
+        self.assertEqual(self.version(), 4)
+
+        main.migrate(self.manager, main.MIGRATIONS[:5])
+        self.assertEqual(self.version(), 5)
+        self.assertEqual(self.rows(), (
+            [(1250, main.to_timestamp(datetime.datetime(2024, 1, 2, 10, 0)))],
+            [(325, main.to_timestamp(datetime.datetime(2024, 1, 3, 11, 30)))]))
+
+    def test_copy_rows_resumes_after_the_last_copied_chunk(self):
+        self.connection.execute("CREATE TABLE source (id INTEGER PRIMARY KEY, amount REAL)")
+        self.connection.execute("CREATE TABLE source_new (id INTEGER PRIMARY KEY, amount INTEGER)")
+        with self.manager.transaction() as connection:
+            connection.executemany("INSERT INTO source (id, amount) VALUES (?, ?)",
+                [(i, i + 0.5) for i in (1, 2, 4, 5, 7, 8, 9)])
+        copy = main.CopyRows("source", "source_new", "id, amount", "id, CAST(amount * 2 AS INTEGER)",
+            "id != 5", chunk_size=2)
+
+        self.manager.transactions = 2
+        with self.assertRaises(KeyboardInterrupt):
+            copy.run(self.manager)
+        self.assertEqual(self.connection.execute("SELECT id FROM source_new").fetchall(), [(1,), (2,), (4,)])
+
+        self.manager.transactions = None
+        copy.run(self.manager)
+        copy.run(self.manager)
+        self.assertEqual(self.connection.execute("SELECT id, amount FROM source_new").fetchall(),
+            [(1, 3), (2, 5), (4, 9), (7, 15), (8, 17), (9, 19)])
+
+    def test_backfill_resumes_after_the_last_updated_chunk(self):
+        self.connection.execute("CREATE TABLE ledger (id INTEGER PRIMARY KEY, amount INTEGER)")
+        with self.manager.transaction() as connection:
+            connection.executemany("INSERT INTO ledger (id, amount) VALUES (?, ?)",
+                [(i, i * 10) for i in range(1, 8)])
+        self.connection.execute("ALTER TABLE ledger ADD COLUMN doubled INTEGER")
+        backfill = main.Backfill("ledger", "doubled = amount * 2", "doubled IS NULL", chunk_size=3)
+        def filled():
+            return self.connection.execute("SELECT COUNT(doubled), COUNT(*) FROM ledger").fetchone()
+
+        self.manager.transactions = 1
+        with self.assertRaises(KeyboardInterrupt):
+            backfill.run(self.manager)
+        self.assertEqual(filled(), (3, 7))
+
+        self.manager.transactions = None
+        backfill.run(self.manager)
+        backfill.run(self.manager)
+        self.assertEqual(filled(), (7, 7))
+        self.assertEqual(self.connection.execute("SELECT COUNT(*) FROM ledger WHERE doubled != amount * 2").fetchone(), (0,))
+
+    def test_migrate_to_latest(self):
+        self.legacy_database()
+        self.assertEqual(main.migrate(self.manager), main.MIGRATIONS[-1].version)
+        self.assertEqual(main.migrate(self.manager), main.MIGRATIONS[-1].version)
+
+
+if __name__ == "__main__":
+    unittest.main()
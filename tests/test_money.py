@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+class MoneyTest(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(main.Money.parse("1,250.5").minor, 125050)
+        self.assertEqual(main.Money.parse("-0.005").minor, -1)
+        self.assertEqual(str(main.Money.parse("12.345")), "12.35")
+
+    def test_parse_rejects_text(self):
+        for text in ("", "abc", "nan", "inf"):
+            with self.assertRaises(ValueError):
+                main.Money.parse(text)
+
+    def test_parse_keeps_amounts_in_sqlite_integer_range(self):
+        self.assertEqual(main.Money.parse("92233720368547758.07").minor, 2**63 - 1)
+        self.assertEqual(main.Money.parse("-92233720368547758.07").minor, -(2**63 - 1))
+        for text in ("92233720368547758.08", "-92233720368547758.08", "1e20", "-1e20"):
+            with self.assertRaisesRegex(ValueError, "Invalid amount"):
+                main.Money.parse(text)
+
+
+if __name__ == "__main__":
+    unittest.main()
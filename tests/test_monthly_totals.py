@@ -0,0 +1,95 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def date(year, month, day):
+    return main.to_timestamp(datetime.datetime(year, month, day, 12, 0))
+
+
+class MonthlyTotalsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.directory.name, "database"))
+        self.manager = main.ConnectionManager(self.directory.name)
+        main.migrate(self.manager)
+        self.connection = self.manager.get_connection()
+
+    def tearDown(self):
+        self.manager.close()
+        self.directory.cleanup()
+
+    def execute(self, query, params=()):
+        with self.manager.transaction() as connection:
+            connection.execute(query, params)
+
+    def totals(self):
+        return self.connection.execute("SELECT * FROM monthly_totals ORDER BY 1, 2, 3, 4").fetchall()
+
+    # the trigger-maintained table must equal a full rebuild, as run by --rebuild-totals
+    def assert_matches_rebuild(self):
+        kept = self.totals()
+        main.rebuild_monthly_totals(self.manager)
+        self.assertEqual(kept, self.totals())
+
+    def add_expense(self, user_id, date, exp_type, amount):
+        self.execute("INSERT INTO expense (user_id, exp_date, exp_type, exp_amt, exp_description) VALUES (?, ?, ?, ?, '')",
+            (user_id, date, exp_type, amount))
+
+    def test_expense_triggers(self):
+        self.add_expense(1, date(2024, 1, 31), "food", 100)
+        self.add_expense(1, date(2024, 1, 15), "food", 250)
+        self.add_expense(1, date(2024, 2, 1), "rent", 9000)
+        self.add_expense(2, date(2024, 1, 15), "food", 7)
+        self.add_expense(1, None, None, None)
+        self.assert_matches_rebuild()
+        self.assertIn((1, 202401, main.TOTALS_EXPENSE, "food", 350, 2), self.totals())
+
+        # move an expense across months, then across years
+        self.execute("UPDATE expense SET exp_date = ? WHERE exp_amt = 100", (date(2024, 2, 29),))
+        self.assert_matches_rebuild()
+        self.execute("UPDATE expense SET exp_date = ? WHERE exp_amt = 100", (date(2023, 12, 31),))
+        self.assert_matches_rebuild()
+        # change the amount, the category, the user and clear the date
+        self.execute("UPDATE expense SET exp_amt = 300 WHERE exp_amt = 250")
+        self.assert_matches_rebuild()
+        self.execute("UPDATE expense SET exp_type = 'rent' WHERE exp_amt = 300")
+        self.assert_matches_rebuild()
+        self.execute("UPDATE expense SET user_id = 1 WHERE user_id = 2")
+        self.assert_matches_rebuild()
+        self.execute("UPDATE expense SET exp_date = NULL WHERE exp_type = 'rent'")
+        self.assert_matches_rebuild()
+        # an update of other columns leaves the totals alone
+        self.execute("UPDATE expense SET exp_description = 'note'")
+        self.assert_matches_rebuild()
+
+        self.execute("DELETE FROM expense WHERE exp_amt = 100")
+        self.assert_matches_rebuild()
+        self.execute("DELETE FROM expense")
+        self.assertEqual(self.totals(), [])
+
+    def test_budget_triggers(self):
+        rows = [(1, kind, date(2024, month, 10), "plan", 1000 * month)
+            for kind in (main.BUDGET_EXPENSE, main.BUDGET_INCOME) for month in (1, 2, 3)]
+        with self.manager.transaction() as connection:
+            connection.executemany(main.insert_budget_line, [row + ("",) for row in rows])
+        self.assert_matches_rebuild()
+
+        self.execute("UPDATE budget SET bg_date = ? WHERE bg_amt = 1000", (date(2024, 3, 31),))
+        self.assert_matches_rebuild()
+        self.execute("UPDATE budget SET category_kind = ? WHERE bg_amt = 2000", (main.BUDGET_SAVING,))
+        self.assert_matches_rebuild()
+        self.execute("UPDATE budget SET bg_label = 'other', bg_amt = bg_amt + 1 WHERE bg_amt = 3000")
+        self.assert_matches_rebuild()
+        self.execute("DELETE FROM budget WHERE category_kind = ?", (main.BUDGET_INCOME,))
+        self.assert_matches_rebuild()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+# a low cost keeps the tests fast, an older hash has fewer iterations
+ITERATIONS = 1000
+
+
+class PasswordTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(main, "PASSWORD_ITERATIONS", ITERATIONS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_verify(self):
+        stored = main.hash_password("secret")
+        self.assertTrue(stored.startswith(f"{main.PASSWORD_ALGORITHM}${ITERATIONS}$"))
+        self.assertTrue(main.verify_password("secret", stored))
+        self.assertFalse(main.verify_password("Secret", stored))
+        self.assertFalse(main.verify_password("", stored))
+        self.assertFalse(main.needs_rehash(stored))
+
+    def test_salt_differs_per_hash(self):
+        self.assertNotEqual(main.hash_password("secret"), main.hash_password("secret"))
+
+    def test_verify_legacy_plaintext(self):
+        self.assertTrue(main.verify_password("secret", "secret"))
+        self.assertFalse(main.verify_password("wrong", "secret"))
+        self.assertTrue(main.needs_rehash("secret"))
+
+    def test_verify_old_iterations(self):
+        stored = main.hash_password("secret", ITERATIONS // 2)
+        self.assertTrue(main.verify_password("secret", stored))
+        self.assertFalse(main.verify_password("wrong", stored))
+        self.assertTrue(main.needs_rehash(stored))
+
+
+class LoginTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.directory.name, "database"))
+        self.manager = main.ConnectionManager(self.directory.name)
+        main.migrate(self.manager)
+        for name, value in (("db", self.manager), ("PASSWORD_ITERATIONS", ITERATIONS)):
+            patcher = mock.patch.object(main, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.manager.close()
+        self.directory.cleanup()
+
+    def add_user(self, stored):
+        main.execute_query("INSERT INTO users (username, password) VALUES (?, ?)", ("user", stored))
+
+    def stored(self):
+        return main.execute_read_query("SELECT password FROM users WHERE username = ?", ("user",))[0][0]
+
+    def check_user(self, username, password):
+        # CheckUser only reads the database, it runs on the worker without the page
+        return main.Login.CheckUser(None, username, password)
+
+    def test_wrong_password_and_username(self):
+        self.add_user(main.hash_password("secret"))
+        self.assertEqual(self.check_user("user", "wrong"), ("password", None))
+        self.assertEqual(self.check_user("nobody", "secret"), ("username", None))
+
+    def test_login_rehashes_legacy_plaintext(self):
+        self.add_user("secret")
+        self.assertEqual(self.check_user("user", "wrong"), ("password", None))
+        self.assertEqual(self.stored(), "secret")
+        status, user_id = self.check_user("user", "secret")
+        self.assertEqual(status, "success")
+        stored = self.stored()
+        self.assertEqual(main.split_password_hash(stored)[0], ITERATIONS)
+        self.assertTrue(main.verify_password("secret", stored))
+
+    def test_login_rehashes_old_iterations(self):
+        self.add_user(main.hash_password("secret", ITERATIONS // 2))
+        self.assertEqual(self.check_user("user", "secret")[0], "success")
+        stored = self.stored()
+        self.assertEqual(main.split_password_hash(stored)[0], ITERATIONS)
+        self.assertTrue(main.verify_password("secret", stored))
+        # a current hash is left alone
+        self.assertEqual(self.check_user("user", "secret")[0], "success")
+        self.assertEqual(self.stored(), stored)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import datetime
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+# local noon of a yyyy-mm-dd date
+def date(text):
+    return main.to_timestamp(datetime.datetime.strptime(text, "%Y-%m-%d") + datetime.timedelta(hours=12))
+
+# periods of every grain of a day number
+def periods(day):
+    return main.RollupCube.periods(main.to_timestamp(
+        datetime.datetime(1970, 1, 1) + datetime.timedelta(days=day, hours=12)))
+
+
+class RollupCubeTest(unittest.TestCase):
+    def test_period_days(self):
+        for day in range(19000, 20200):
+            month = main.month_number(day)
+            for grain, period in (("day", day), ("week", main.week_number(day)),
+                    ("month", month), ("year", month // 12)):
+                first, last = main.period_days(grain, period)
+                self.assertLessEqual(first, day)
+                self.assertLessEqual(day, last)
+                self.assertEqual(periods(first)[grain], period)
+                self.assertEqual(periods(last)[grain], period)
+                self.assertNotEqual(periods(first - 1)[grain], period)
+                self.assertNotEqual(periods(last + 1)[grain], period)
+
+    def test_rows_clip_periods_to_a_mid_month_range(self):
+        cube = main.RollupCube()
+        for text, amount in (("2024-01-15", 1000), ("2024-03-05", 200), ("2024-03-10", 30),
+                ("2024-03-15", 4), ("2024-03-20", 5000), ("2024-03-21", 600000)):
+            cube.add(main.TOTALS_EXPENSE, "food", amount, date(text))
+        strt_dt, end_dt = main.date_range_bounds("2024-03-10", "2024-03-20")
+        rows = cube.rows([main.TOTALS_EXPENSE], main.day_number(strt_dt), main.day_number(end_dt - 1))
+
+        totals = {}
+        for grain, period, category, total, count in rows:
+            totals.setdefault(grain, {})[period] = (total, count)
+        self.assertEqual(totals["year"], {2024: (5034, 3)})
+        self.assertEqual(totals["month"], {2024 * 12 + 2: (5034, 3)})
+        # 2024-03-10 is a Sunday, the other two days fall in the next two weeks
+        self.assertEqual(sorted(totals["week"].values()), [(4, 1), (30, 1), (5000, 1)])
+        self.assertEqual(sorted(totals["day"].values()), [(4, 1), (30, 1), (5000, 1)])
+
+    def test_rows_keep_whole_periods(self):
+        cube = main.RollupCube()
+        for text in ("2024-02-01", "2024-02-29", "2024-03-01"):
+            cube.add(main.TOTALS_EXPENSE, "rent", 100, date(text))
+        strt_dt, end_dt = main.date_range_bounds("2024-02-01", "2024-02-29")
+        rows = cube.rows([main.TOTALS_EXPENSE], main.day_number(strt_dt), main.day_number(end_dt - 1))
+        self.assertIn(("month", 2024 * 12 + 1, "rent", 200, 2), rows)
+        self.assertIn(("year", 2024, "rent", 200, 2), rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
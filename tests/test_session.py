@@ -0,0 +1,107 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.directory.name, "database"))
+        self.manager = main.ConnectionManager(self.directory.name)
+        main.migrate(self.manager)
+        patcher = mock.patch.object(main, "db", self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # a bus and chart cache of its own so versions and summaries of other tests do not leak in
+        for name, value in (("bus", main.EventBus()), ("charts", main.ChartCache())):
+            patcher = mock.patch.object(main, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.date = main.to_timestamp(datetime.datetime(2024, 1, 3, 12, 0))
+        self.strt_dt, self.end_dt = main.date_range_bounds("2024-01-01", "2024-01-31")
+
+    def tearDown(self):
+        self.manager.close()
+        self.directory.cleanup()
+
+    @unittest.skipIf(main.load_numpy() is None, "NumPy is not installed")
+    def test_budget_summary_sees_writes_of_earlier_sessions(self):
+        first = main.Session(1, "user")
+        report, image = first.budget_summary(self.strt_dt, self.end_dt, "week")
+        self.assertEqual(int(report.actual.sum()), 0)
+        first.add_expense(self.date, "food", main.Money(10000), "")
+
+        # log out and back in
+        second = main.Session(1, "user")
+        report, image = second.budget_summary(self.strt_dt, self.end_dt, "week")
+        self.assertEqual(int(report.actual.sum()), 10000)
+
+    @unittest.skipIf(main.load_numpy() is None, "NumPy is not installed")
+    def test_budget_summary_sees_writes_of_other_sessions(self):
+        gui = main.Session(1, "user")
+        importer = main.Session(1, "importer")
+        gui.budget_summary(self.strt_dt, self.end_dt, "week")
+        importer.add_expense(self.date, "food", main.Money(2500), "")
+        report, image = gui.budget_summary(self.strt_dt, self.end_dt, "week")
+        self.assertEqual(int(report.actual.sum()), 2500)
+
+    def test_whole_months(self):
+        self.assertEqual(main.whole_months(*main.date_range_bounds("2024-11-01", "2025-01-31")), (202411, 202501))
+        self.assertIsNone(main.whole_months(*main.date_range_bounds("2024-11-02", "2025-01-31")))
+        self.assertIsNone(main.whole_months(*main.date_range_bounds("2024-11-01", "2025-01-30")))
+
+    @unittest.skipIf(main.load_numpy() is None, "NumPy is not installed")
+    def test_monthly_report_reads_monthly_totals(self):
+        session = main.Session(1, "user")
+        for day in range(0, 400, 7):
+            date = self.date + day * main.SECONDS_PER_DAY
+            session.add_expense(date, "food" if day % 2 else "rent", main.Money(1000 + day), "")
+            session.add_expense(date, None, main.Money(5), "")
+        session.add_budget_lines(main.BUDGET_EXPENSE, [(self.date, "food", main.Money(20000), "")])
+        strt_dt, end_dt = main.date_range_bounds("2024-01-01", "2024-12-31")
+        for period in ("month", "year"):
+            with mock.patch.object(main.Session, "monthly_totals") as monthly_totals:
+                monthly_totals.side_effect = lambda first, last: main.execute_read_query(
+                    main.select_monthly_totals, (1, first, last))
+                report = session.budget_report(strt_dt, end_dt, period)
+                monthly_totals.assert_called_once_with(202401, 202412)
+            with mock.patch.object(main, "whole_months", return_value=None):
+                expected = session.budget_report(strt_dt, end_dt, period)
+            self.assertTrue(list(expected.rows()))
+            self.assertEqual(sorted(map(str, report.rows())), sorted(map(str, expected.rows())))
+
+    def cached(self, session):
+        day = main.day_number(self.date)
+        return (session.spend_between(day, day),
+            session.rollup_categories([main.TOTALS_EXPENSE], "day", day),
+            [row[2] for row in session.budget_page(main.BUDGET_EXPENSE, main.PAGE_START, True, main.PAGE_SIZE)],
+            [row[1] for row in session.subscriptions()])
+
+    def test_caches_see_writes_of_other_sessions(self):
+        gui = main.Session(1, "user")
+        importer = main.Session(1, "importer")
+        self.assertEqual(self.cached(gui), (0, {}, [], []))
+        importer.add_expense(self.date, "food", main.Money(2500), "")
+        importer.add_budget_lines(main.BUDGET_EXPENSE, [(self.date, "food", main.Money(9000), "")])
+        importer.add_subscription("music", main.Money(999), "month", self.date, None, "")
+        self.assertEqual(self.cached(gui), (2500, {"food": [2500, 1]}, ["food"], ["music"]))
+
+    def test_own_writes_update_caches_in_place(self):
+        session = main.Session(1, "user")
+        self.cached(session)
+        cube, daily_spend = session.rollup(), session.daily_spend()
+        session.add_expense(self.date, "food", main.Money(2500), "")
+        self.assertEqual(self.cached(session)[:2], (2500, {"food": [2500, 1]}))
+        self.assertIs(session.rollup(), cube)
+        self.assertIs(session.daily_spend(), daily_spend)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+class StatsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.directory.name, "database"))
+        self.manager = main.ConnectionManager(self.directory.name)
+
+    def tearDown(self):
+        self.manager.close()
+        self.directory.cleanup()
+
+    def test_statements_seen(self):
+        self.manager.execute_query("CREATE TABLE ledger (id INTEGER PRIMARY KEY, amount INTEGER)")
+        for amount in range(3):
+            self.manager.execute_query("INSERT INTO ledger (amount) VALUES (?)", (amount,))
+        self.manager.execute_many_query("INSERT INTO ledger (amount) VALUES (?)", [(1,), (2,)])
+        self.manager.execute_read_query("SELECT SUM(amount) FROM ledger")
+        self.assertEqual(self.manager.statements_seen_stats(), {"runs": 6, "distinct_statements": 3,
+            "most_on_one_connection": 3, "cached_statements": main.STATEMENT_CACHE_SIZE})
+        stats = json.loads(self.manager.dump_stats())
+        self.assertEqual(stats["statements_seen"]["distinct_statements"], 3)
+        self.assertEqual(stats["statements"]["INSERT INTO ledger (amount) VALUES (?)"]["count"], 4)
+
+    def test_normalize_query_is_memoized(self):
+        main.normalize_query.cache_clear()
+        for _ in range(3):
+            self.manager.execute_read_query("SELECT 1 + 2,  'a''b'")
+        self.assertIn("SELECT ? + ?, ?", json.loads(self.manager.dump_stats())["statements"])
+        info = main.normalize_query.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def date(text):
+    return main.parse_date(text)
+
+def dates(charges):
+    return [main.format_timestamp(charge[0], main.DATE_FORMAT) for charge in charges]
+
+# rule as read by select_subscriptions
+def rule(sub_id, interval, anchor, end=None, amount=100):
+    return (sub_id, f"sub {sub_id}", amount, interval, date(anchor), end and date(end), "")
+
+
+class SubscriptionChargesTest(unittest.TestCase):
+    def test_month_end_anchor_clamps_to_short_months(self):
+        charges = main.subscription_charges(rule(1, "month", "2024-01-31"), date("2024-01-01"), date("2024-08-01"))
+        self.assertEqual(dates(charges), ["2024-01-31", "2024-02-29", "2024-03-31", "2024-04-30",
+            "2024-05-31", "2024-06-30", "2024-07-31"])
+
+    def test_leap_day_anchor_clamps_in_other_years(self):
+        charges = main.subscription_charges(rule(1, "year", "2024-02-29"), date("2024-01-01"), date("2029-01-01"))
+        self.assertEqual(dates(charges), ["2024-02-29", "2025-02-28", "2026-02-28", "2027-02-28", "2028-02-29"])
+
+    def test_window_far_after_the_anchor(self):
+        charges = main.subscription_charges(rule(1, "month", "2000-01-31"), date("2031-02-01"), date("2031-05-01"))
+        self.assertEqual(dates(charges), ["2031-02-28", "2031-03-31", "2031-04-30"])
+        charges = main.subscription_charges(rule(1, "week", "2000-01-03"), date("2031-02-01"), date("2031-02-15"))
+        self.assertEqual(dates(charges), ["2031-02-03", "2031-02-10"])
+
+    def test_end_date_is_exclusive(self):
+        # read_subscription stores the day after the entered end date
+        charges = main.subscription_charges(rule(1, "month", "2024-01-15", "2024-04-16"), date("2024-01-01"), date("2025-01-01"))
+        self.assertEqual(dates(charges), ["2024-01-15", "2024-02-15", "2024-03-15", "2024-04-15"])
+        charges = main.subscription_charges(rule(1, "month", "2024-01-15", "2024-04-15"), date("2024-01-01"), date("2025-01-01"))
+        self.assertEqual(dates(charges), ["2024-01-15", "2024-02-15", "2024-03-15"])
+
+    def test_window_bounds(self):
+        charges = main.subscription_charges(rule(1, "week", "2024-01-01"), date("2024-01-08"), date("2024-01-22"))
+        self.assertEqual(dates(charges), ["2024-01-08", "2024-01-15"])
+        self.assertEqual(list(main.subscription_charges(rule(1, "week", "2024-01-01"), date("2023-01-01"), date("2024-01-01"))), [])
+
+    def test_merge_orders_by_date_then_rule(self):
+        rules = [rule(3, "year", "2023-03-01"), rule(1, "month", "2024-01-31"),
+            rule(2, "week", "2024-02-26", "2024-03-12")]
+        charges = list(main.merge_subscription_charges(rules, date("2024-02-01"), date("2024-04-01")))
+        self.assertEqual([(day, charge[1]) for day, charge in zip(dates(charges), charges)], [
+            ("2024-02-26", 2), ("2024-02-29", 1), ("2024-03-01", 3),
+            ("2024-03-04", 2), ("2024-03-11", 2), ("2024-03-31", 1)])
+        expected = sorted(charge for one in rules
+            for charge in main.subscription_charges(one, date("2024-02-01"), date("2024-04-01")))
+        self.assertEqual(charges, expected)
+
+    def test_same_day_charges_keep_rule_order(self):
+        rules = [rule(2, "month", "2024-01-01", amount=5), rule(1, "month", "2024-01-01", amount=7)]
+        charges = list(main.merge_subscription_charges(rules, date("2024-01-01"), date("2024-03-01")))
+        self.assertEqual([charge[1] for charge in charges], [1, 2, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+# Stands in for the Tk root, after() only remembers what was scheduled
+class Root:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+    def after_cancel(self, poll_id):
+        pass
+
+
+class PollTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Root()
+        self.bus = main.EventBus()
+        self.worker = main.DatabaseWorker(self.root, bus=self.bus)
+        self.called = []
+
+    def finished(self, callback, result):
+        self.worker.results.put((main.DatabaseRequest(len, (), callback, None), result, None))
+
+    # run one job on the worker thread and hand its result to the callbacks
+    def run_job(self, function, **kwargs):
+        self.worker.start()
+        self.addCleanup(self.worker.stop)
+        self.worker.submit(function, **kwargs)
+        request, result, failure = self.worker.results.get(timeout=5)
+        self.worker.results.put((request, result, failure))
+        self.worker.Poll()
+
+    def fail(self, *args):
+        raise ValueError("callback failed")
+
+    def test_failing_callback_does_not_stop_polling(self):
+        self.finished(self.fail, 1)
+        self.finished(self.called.append, 2)
+        with self.assertLogs(main.logger, "ERROR"):
+            self.worker.Poll()
+        self.assertEqual(self.called, [2])
+        self.assertEqual(self.root.scheduled, [self.worker.Poll])
+
+    def test_failing_subscriber_does_not_stop_dispatch(self):
+        self.bus.subscribe("expense", self.fail)
+        self.bus.subscribe("expense", lambda user_id, category: self.called.append(user_id))
+        self.bus.publish("expense", 1)
+        self.bus.publish("expense", 2)
+        with self.assertLogs(main.logger, "ERROR"):
+            self.worker.Poll()
+        self.assertEqual(self.called, [1, 2])
+        self.assertEqual(self.root.scheduled, [self.worker.Poll])
+
+    def test_failing_job_calls_its_error_callback(self):
+        with self.assertLogs(main.logger, "ERROR"):
+            self.run_job(self.fail, callback=self.called.append, error=self.called.append)
+        self.assertEqual([type(e) for e in self.called], [ValueError])
+        self.assertEqual(self.root.scheduled, [self.worker.Poll])
+
+    def test_failing_job_without_error_callback_warns(self):
+        with mock.patch.object(main.messagebox, "showwarning") as showwarning:
+            with self.assertLogs(main.logger, "ERROR"):
+                self.run_job(self.fail, callback=self.called.append)
+        showwarning.assert_called_once()
+        self.assertEqual(self.called, [])
+
+
+if __name__ == "__main__":
+    unittest.main()